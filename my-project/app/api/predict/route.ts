@@ -1,13 +1,30 @@
 // app/api/predict/route.ts
 import { NextRequest, NextResponse } from "next/server";
+import { predictProxied, proxyStats } from "@/lib/predictProxy";
+
+export const runtime = "nodejs";
+export const dynamic = "force-dynamic";
 
 export async function POST(request: NextRequest) {
-  const { home_team = "", away_team = "" } = await request.json();
-  const seed = (home_team.length * 13 + away_team.length * 7) % 100;
-  const home = 0.42 + (seed % 10) / 100;
-  const away = 0.25 + ((seed + 3) % 10) / 100;
-  const draw = Math.max(0, 1 - home - away);
-  const probs = { home, draw, away };
-  const label = home >= draw && home >= away ? "home" : draw >= away ? "draw" : "away";
-  return NextResponse.json({ label, probs });
+  const { league_id, home_team, away_team } = await request.json().catch(() => ({}));
+  if (![league_id, home_team, away_team].every(v => typeof v === "string" && v.trim())) {
+    return NextResponse.json({ detail: "Wymagane pola: league_id, home_team, away_team" }, { status: 400 });
+  }
+
+  try {
+    const result = await predictProxied({ league_id, home_team, away_team });
+    // Nierozpoznana liga lub drużyna - ten sam status i treść co POST /api/predict w FastAPI
+    return NextResponse.json(result, { status: "detail" in result ? 404 : 200 });
+  } catch (err: any) {
+    return NextResponse.json({ detail: `Backend niedostępny: ${err?.message || err}` }, { status: 502 });
+  }
+}
+
+// Liczniki proxy (zapytania, trafienia w cache, połączone zapytania, paczki do FastAPI) - do weryfikacji z lokalnym backendem;
+// dostępne tylko po ustawieniu PREDICT_PROXY_STATS=1
+export async function GET() {
+  if (process.env.PREDICT_PROXY_STATS !== "1") {
+    return NextResponse.json({ detail: "Not Found" }, { status: 404 });
+  }
+  return NextResponse.json(proxyStats);
 }
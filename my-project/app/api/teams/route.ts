@@ -0,0 +1,22 @@
+// app/api/teams/route.ts
+import { NextRequest, NextResponse } from "next/server";
+import { BACKEND_URL } from "@/lib/config";
+
+export const runtime = "nodejs";
+export const dynamic = "force-dynamic";
+
+// Podpowiedzi drużyn idą przez serwer Next.js, tak jak predykcje - przeglądarka nie łączy się z FastAPI bezpośrednio
+export async function GET(request: NextRequest) {
+  const params = new URLSearchParams();
+  for (const key of ["league_id", "q", "limit"]) {
+    const value = request.nextUrl.searchParams.get(key);
+    if (value !== null) params.set(key, value);
+  }
+
+  try {
+    const res = await fetch(`${BACKEND_URL.replace(/\/+$/, "")}/api/teams?${params}`, { cache: "no-store" });
+    return NextResponse.json(await res.json(), { status: res.status });
+  } catch (err: any) {
+    return NextResponse.json({ detail: `Backend niedostępny: ${err?.message || err}` }, { status: 502 });
+  }
+}
@@ -1,18 +1,16 @@
 import numpy as np
 import pandas as pd
-import joblib
-import glob
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from functools import lru_cache
 from pathlib import Path
-from sklearn.model_selection import TimeSeriesSplit, train_test_split
-from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay, accuracy_score, log_loss, f1_score
-from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.metrics import ConfusionMatrixDisplay
 
 # Próba importu, żeby obliczenia na żywo działały
 try:
-    from ml.train_model import calculate_features, LAST_N
-    from ml.utils import load_matches_folder
+    from ml.artifacts import list_artifacts
+    from ml.evaluation import current_reports
 except ImportError:
     print("Ostrzeżenie: Nie udało się zaimportować modułów ML. Uruchom skrypt z właściwego folderu.")
 
@@ -21,13 +19,25 @@ BASE_DIR = Path(__file__).resolve().parent
 if (BASE_DIR / "data").exists():
     DATA_DIR = BASE_DIR / "data"
     MODELS_DIR = BASE_DIR / "models"
+    REPORTS_DIR = BASE_DIR / "reports"
 else:
     DATA_DIR = BASE_DIR / "backend" / "data"
     MODELS_DIR = BASE_DIR / "backend" / "models"
+    REPORTS_DIR = BASE_DIR / "backend" / "reports"
+
+@lru_cache(maxsize=1)
+def wszystkie_raporty():
+    # Wyniki ewaluacji z reports/report_{liga}.json, wczytywane raz na uruchomienie skryptu;
+    # nieaktualne wzgledem modelu lub plikow danych sa liczone od nowa
+    return current_reports(None, MODELS_DIR, DATA_DIR, REPORTS_DIR)
+
+def wczytaj_raporty(ligi=None):
+    return {l: r for l, r in wszystkie_raporty().items() if ligi is None or l in ligi}
 
 def generuj_class_imbalance():
     etykiety = ['Zwycięstwo gospodarzy (Home)', 'Zwycięstwo gości (Away)', 'Remis (Draw)']
-    wartosci = [44.11, 32.22, 23.67] # Twarde dane wyliczone przez model dla Premier League
+    procenty = wczytaj_raporty(["premier"])["premier"]["class_balance"]["percent"]
+    wartosci = [procenty["home"], procenty["away"], procenty["draw"]]
     kolory = ['#1f77b4', '#d62728', '#7f7f7f'] 
 
     fig, ax = plt.subplots(figsize=(8, 6))
@@ -46,7 +56,7 @@ def generuj_class_imbalance():
     plt.tight_layout()
     plt.savefig(nazwa_pliku, dpi=300)
     plt.close()
-    print(f"[1/5] Sukces! Wygenerowano: {nazwa_pliku}")
+    print(f"[1/6] Sukces! Wygenerowano: {nazwa_pliku}")
 
 def generuj_rolling_window():
     fig, ax = plt.subplots(figsize=(11, 5))
@@ -81,13 +91,12 @@ def generuj_rolling_window():
     plt.tight_layout()
     plt.savefig(nazwa_pliku, dpi=300)
     plt.close()
-    print(f"[2/5] Sukces! Wygenerowano: {nazwa_pliku}")
+    print(f"[2/6] Sukces! Wygenerowano: {nazwa_pliku}")
 
 
 def generuj_tabele_wynikow():
-    print(f"[3/5] Generowanie w pełni dynamicznej tabeli (Testuję modele na żywo - to może potrwać kilkanaście sekund)...")
+    print("[3/6] Generowanie tabeli wyników z raportów ewaluacji (reports/)...")
     
-    model_files = glob.glob(str(MODELS_DIR / "model_*.pkl"))
     dane_do_tabeli = []
 
     slownik_nazw = {
@@ -98,47 +107,13 @@ def generuj_tabele_wynikow():
         "superlig": "Super Lig (TUR)", "ekstraklasa": "Ekstraklasa (POL)"
     }
 
-    for mf in model_files:
-        try:
-            mf_path = Path(mf)
-            league_id = mf_path.stem.replace("model_", "")
-            
-            # Ładujemy model
-            zapisany_stan = joblib.load(mf_path)
-            model = zapisany_stan["model"]
-            scaler = zapisany_stan["scaler"]
-            target_enc = zapisany_stan["target_encoder"]
-            
-            # Identyfikacja kto wygrał
-            model_name = "Regresja Logistyczna" if isinstance(model, LogisticRegression) else "Random Forest"
-            
-            # Pobieramy dane ligi i wyliczamy metryki na testowym (ostatnie 20%)
-            league_dir = DATA_DIR / league_id
-            raw_df = load_matches_folder(league_dir)
-            out = calculate_features(raw_df)
-            df = out[0] if isinstance(out, tuple) else out
-            
-            df = df.iloc[LAST_N * 2:]
-            y = target_enc.transform(df["target"])
-            features = ["h_form_goals", "a_form_goals", "h_form_points", "a_form_points"]
-            X = df[features].values
-            X = scaler.transform(X)
-            
-            _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
-            
-            y_pred = model.predict(X_test)
-            y_proba = model.predict_proba(X_test)
-            
-            acc = accuracy_score(y_test, y_pred)
-            loss = log_loss(y_test, y_proba)
-            f1 = f1_score(y_test, y_pred, average='macro')
-            
-            ladna_nazwa = slownik_nazw.get(league_id, league_id.upper())
-            dane_do_tabeli.append({
-                "liga": ladna_nazwa, "model": model_name, "acc": acc, "loss": loss, "f1": f1
-            })
-        except Exception as e:
-            print(f"Pominąłem {mf.name} z powodu błędu: {e}")
+    for league_id, raport in wczytaj_raporty().items():
+        model_name = "Regresja Logistyczna" if raport["model_type"] == "logreg" else "Random Forest"
+        ladna_nazwa = slownik_nazw.get(league_id, league_id.upper())
+        dane_do_tabeli.append({
+            "liga": ladna_nazwa, "model": model_name,
+            "acc": raport["accuracy"], "loss": raport["log_loss"], "f1": raport["f1_macro"]
+        })
 
     # Sortujemy od najlepszego Log Loss do najgorszego
     dane_do_tabeli.sort(key=lambda x: x["loss"])
@@ -153,7 +128,7 @@ def generuj_tabele_wynikow():
             f"{w['f1']*100:.2f}%".replace(".", ",")
         ])
     
-    kolumny = ["Rozgrywki\n(Zbiór testowy)", "Zwycięski algorytm\n(Z dynamicznego pliku .pkl)", "Dokładność\n(Accuracy)", "Funkcja straty\n(Log Loss)", "Miara F1\n(F1-Score Macro)"]
+    kolumny = ["Rozgrywki\n(Zbiór testowy)", "Zwycięski algorytm\n(Z raportu ewaluacji)", "Dokładność\n(Accuracy)", "Funkcja straty\n(Log Loss)", "Miara F1\n(F1-Score Macro)"]
 
     fig, ax = plt.subplots(figsize=(12, 6))
     ax.axis('off')
@@ -189,7 +164,7 @@ def generuj_tabele_wynikow():
     plt.title("Ewaluacja modeli ML na niezależnym zbiorze testowym", fontsize=16, fontweight='bold', pad=20)
     plt.savefig(nazwa_pliku, dpi=300, bbox_inches='tight')
     plt.close()
-    print(f"[3/5] Sukces! Wygenerowano dynamicznie: {nazwa_pliku}")
+    print(f"[3/6] Sukces! Wygenerowano dynamicznie: {nazwa_pliku}")
 
 def generuj_time_series_split():
     X = np.random.randn(100, 2)
@@ -210,39 +185,19 @@ def generuj_time_series_split():
     plt.tight_layout()
     plt.savefig(nazwa_pliku, dpi=300)
     plt.close()
-    print(f"[4/5] Sukces! Wygenerowano: {nazwa_pliku}")
+    print(f"[4/6] Sukces! Wygenerowano: {nazwa_pliku}")
 
 def generuj_macierz_bledow_dynamicznie():
-    model_path = MODELS_DIR / "model_premier.pkl"
-    league_dir = DATA_DIR / "premier"
-    
-    if not model_path.exists():
-        print(f"[5/5] Ostrzeżenie: Nie znaleziono modelu w {model_path}. Pominę generowanie macierzy dynamicznej.")
+    if "premier" not in list_artifacts(MODELS_DIR):
+        print(f"[5/6] Ostrzeżenie: Nie znaleziono modelu premier w {MODELS_DIR}. Pominę generowanie macierzy dynamicznej.")
         return
 
     try:
-        zapisany_stan = joblib.load(model_path)
-        model = zapisany_stan["model"]
-        scaler = zapisany_stan["scaler"]
-        target_enc = zapisany_stan["target_encoder"]
-        
-        raw_df = load_matches_folder(league_dir)
-        out = calculate_features(raw_df)
-        df = out[0] if isinstance(out, tuple) else out
-        df = df.iloc[LAST_N * 2:] 
-        
-        y = target_enc.transform(df["target"])
-        features = ["h_form_goals", "a_form_goals", "h_form_points", "a_form_points"]
-        X = df[features].values
-        X = scaler.transform(X)
-        
-        _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
-        
-        y_pred = model.predict(X_test)
-        cm = confusion_matrix(y_test, y_pred)
+        macierz = wczytaj_raporty(["premier"])["premier"]["confusion_matrix"]
+        cm = np.array(macierz["matrix"])
         
         fig, ax = plt.subplots(figsize=(7, 5))
-        disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=target_enc.classes_)
+        disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=macierz["labels"])
         disp.plot(cmap='Blues', ax=ax, values_format='d')
         
         plt.title("Macierz błędów - Premier League", pad=15, fontweight='bold')
@@ -253,13 +208,48 @@ def generuj_macierz_bledow_dynamicznie():
         nazwa_pliku = "macierz_bledow_premier_wykresy.png"
         plt.savefig(nazwa_pliku, dpi=300)
         plt.close()
-        print(f"[5/5] Sukces! Wygenerowano dynamicznie: {nazwa_pliku}")
+        print(f"[5/6] Sukces! Wygenerowano dynamicznie: {nazwa_pliku}")
     except Exception as e:
-         print(f"[5/5] Ostrzeżenie: Błąd generowania macierzy dynamicznej: {e}. Użyj tej wygenerowanej przy trenowaniu!")
+         print(f"[5/6] Ostrzeżenie: Błąd generowania macierzy dynamicznej: {e}. Użyj tej wygenerowanej przy trenowaniu!")
+
+def generuj_krzywe_kalibracji(league_id="premier"):
+    raport = wczytaj_raporty([league_id]).get(league_id)
+    if raport is None:
+        print(f"[6/6] Ostrzeżenie: Brak raportu dla ligi {league_id}. Pominę krzywe kalibracji.")
+        return
+
+    kolory = {"home": '#1f77b4', "away": '#d62728', "draw": '#7f7f7f'}
+    fig, (ax, ax_ll) = plt.subplots(1, 2, figsize=(14, 6))
+
+    ax.plot([0, 1], [0, 1], linestyle='--', color='black', alpha=0.6, label='Idealna kalibracja')
+    for klasa, krzywa in raport["reliability_curves"].items():
+        punkty = [(p, f) for p, f in zip(krzywa["mean_pred"], krzywa["freq"]) if p is not None]
+        if punkty:
+            xs, ys = zip(*punkty)
+            ax.plot(xs, ys, marker='o', color=kolory.get(klasa), label=klasa)
+    rozklad = raport["brier_decomposition"]
+    ax.set(xlim=(0, 1), ylim=(0, 1), xlabel="Średnie przewidywane prawdopodobieństwo", ylabel="Obserwowana częstość",
+           title=f"Krzywe niezawodności (ECE = {raport['ece']:.3f}, Brier = {raport['brier']:.3f}; REL {rozklad['reliability']:.3f}, RES {rozklad['resolution']:.3f})")
+    ax.legend(loc="upper left")
+    ax.grid(linestyle='--', alpha=0.7)
+
+    kroczacy = raport["rolling_log_loss"]
+    ax_ll.plot(pd.to_datetime(kroczacy["dates"]), kroczacy["values"], color='#1f4e79')
+    ax_ll.set(xlabel="Data meczu (zbiór testowy)", ylabel="Log Loss",
+              title=f"Kroczący Log Loss (okno {kroczacy['window']} meczów)")
+    ax_ll.grid(linestyle='--', alpha=0.7)
+    fig.autofmt_xdate()
+
+    nazwa_pliku = f"krzywe_kalibracji_{league_id}.png"
+    plt.tight_layout()
+    plt.savefig(nazwa_pliku, dpi=300)
+    plt.close()
+    print(f"[6/6] Sukces! Wygenerowano: {nazwa_pliku}")
 
 if __name__ == "__main__":
     generuj_class_imbalance()
     generuj_rolling_window()
     generuj_tabele_wynikow()
     generuj_time_series_split()
-    generuj_macierz_bledow_dynamicznie()
\ No newline at end of file
+    generuj_macierz_bledow_dynamicznie()
+    generuj_krzywe_kalibracji()
\ No newline at end of file
@@ -1,23 +1,41 @@
 from pathlib import Path
 import os
-import joblib
-import pandas as pd
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from datetime import date
 import numpy as np
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import glob
+from pydantic import BaseModel, Field
 
-from ml.utils import load_matches_folder 
+from ml.streaming import dedupe_matches, season_files, season_of, stream_matches
+from ml.teams import TEAMS
+from ml.artifacts import list_artifacts, load_artifact
+from ml.fixtures import fixture_files, load_fixtures
+from update_data import LEAGUES_CODES
 
 BASE_DIR = Path(__file__).resolve().parent
 MODELS_DIR = BASE_DIR / "models" 
 DATA_DIR = BASE_DIR / "data"
 LAST_N = 5
+# Co ile sekund harmonogram sprawdza, czy dane/modele/terminarz zmienily sie na dysku
+REFRESH_INTERVAL = int(os.getenv("REFRESH_INTERVAL", "300"))
+MAX_BATCH = 256
+DIVISIONS = {code: league_id for league_id, code in LEAGUES_CODES.items()}
 
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",") if os.getenv("ALLOWED_ORIGINS") else ["*"]
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop = threading.Event()
+    thread = threading.Thread(target=refresh_loop, args=(stop,), name="fixtures-refresh", daemon=True)
+    thread.start()
+    yield
+    stop.set()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
@@ -31,151 +49,277 @@ class PredictIn(BaseModel):
     home_team: str
     away_team: str
 
-models = {} 
-last_stats = {} 
-raw_histories = {}
-league_tables = {} 
+class PredictBatchIn(BaseModel):
+    items: list[PredictIn] = Field(max_length=MAX_BATCH)
+
+@dataclass(frozen=True)
+class ServingState:
+    # Caly stan serwowania w jednym obiekcie: odswiezanie buduje nowy i podmienia go jednym przypisaniem,
+    # a kazde zapytanie czyta `state` raz, wiec nie miesza starych i nowych danych
+    models: dict = field(default_factory=dict)
+    last_stats: dict = field(default_factory=dict)
+    raw_histories: dict = field(default_factory=dict)
+    league_tables: dict = field(default_factory=dict)
+    league_teams: dict = field(default_factory=dict)
+    fixtures: dict = field(default_factory=dict)          # liga -> nadchodzace mecze z terminarza
+    prediction_cache: dict = field(default_factory=dict)  # (liga, id gospodarzy, id gosci) -> gotowa odpowiedz /api/predict
+
+state = ServingState()
+_fingerprints = {"stats": None, "fixtures": None, "day": None}
+_refresh_lock = threading.Lock()
+
+EMPTY_TABLE = {"rank": 0, "points": 0, "gd": 0, "mp": 0}
 
 def pts_to_char(pts: int) -> str:
     if pts == 3: return "W"
     if pts == 1: return "D"
     return "L"
 
-def load_latest_stats_for_league(league_id: str, league_dir: Path) -> tuple[dict, dict, dict]:
+def load_latest_stats_for_league(league_id: str, league_dir: Path) -> tuple[np.ndarray, list, list]:
     try:
-        df = load_matches_folder(league_dir)
-        df = df.dropna(subset=["date"]) 
-        df = df.sort_values("date")
-        
-        max_date = df["date"].max()
-        if max_date.month >= 7: 
-            season_start = pd.Timestamp(year=max_date.year, month=7, day=1)
-        else:
-            season_start = pd.Timestamp(year=max_date.year - 1, month=7, day=1)
-
-        stats_history = {} 
-        table = {} 
+        stats_history = []
+        table = []  # points, gd, gf, mp
+        current_season = None
         
-        for _, row in df.iterrows():
-            h, a = row["home_team"], row["away_team"]
-            hg, ag = int(row["home_goals"]), int(row["away_goals"])
-            match_date = row["date"]
+        for match_date, home, away, hg, ag in dedupe_matches(stream_matches(season_files(league_dir))):
+            h, a = TEAMS.intern(home), TEAMS.intern(away)
+            while len(stats_history) < len(TEAMS):
+                stats_history.append(deque(maxlen=LAST_N))
+                table.append([0, 0, 0, 0])
+
+            # Tabela liczona tylko dla biezacego (ostatniego w strumieniu) sezonu
+            if season_of(match_date) != current_season:
+                current_season = season_of(match_date)
+                table = [[0, 0, 0, 0] for _ in table]
             
             h_pts = 3 if hg > ag else (1 if hg == ag else 0)
             a_pts = 3 if ag > hg else (1 if ag == hg else 0)
             
-            if h not in stats_history: stats_history[h] = []
-            if a not in stats_history: stats_history[a] = []
-            
-            score_str = f"{h} {hg} - {ag} {a}"
+            score_str = f"{TEAMS.names[h]} {hg} - {ag} {TEAMS.names[a]}"
             stats_history[h].append({"goals": hg, "pts": h_pts, "result": pts_to_char(h_pts), "score": score_str})
             stats_history[a].append({"goals": ag, "pts": a_pts, "result": pts_to_char(a_pts), "score": score_str})
             
-            if match_date >= season_start:
-                if h not in table: table[h] = {"points": 0, "gd": 0, "gf": 0, "mp": 0}
-                if a not in table: table[a] = {"points": 0, "gd": 0, "gf": 0, "mp": 0}
-                
-                table[h]["points"] += h_pts
-                table[h]["gd"] += (hg - ag)
-                table[h]["gf"] += hg
-                table[h]["mp"] += 1
-                
-                table[a]["points"] += a_pts
-                table[a]["gd"] += (ag - hg)
-                table[a]["gf"] += ag
-                table[a]["mp"] += 1
+            table[h] = [table[h][0] + h_pts, table[h][1] + hg - ag, table[h][2] + hg, table[h][3] + 1]
+            table[a] = [table[a][0] + a_pts, table[a][1] + ag - hg, table[a][2] + ag, table[a][3] + 1]
             
-        final_form = {}
-        histories = {}  
-
-        for team, history in stats_history.items():
-            recent = history[-LAST_N:]
-            avg_g = sum(x["goals"] for x in recent) / len(recent) if recent else 0
-            avg_p = sum(x["pts"] for x in recent) / len(recent) if recent else 0
-            final_form[team] = [avg_g, avg_p]
+        n_teams = len(TEAMS)
+        table = np.array(table + [[0, 0, 0, 0]] * (n_teams - len(table)), dtype=np.int64).reshape(n_teams, 4)
+        final_form = np.full((n_teams, 2), np.nan)
+        histories = [[] for _ in range(n_teams)]
+
+        for team, recent in enumerate(stats_history):
+            if not recent:
+                continue
+            final_form[team] = [sum(x["goals"] for x in recent) / len(recent), sum(x["pts"] for x in recent) / len(recent)]
             histories[team] = [{"result": x["result"], "score": x["score"]} for x in recent]
             
-        sorted_teams = sorted(table.keys(), key=lambda t: (table[t]["points"], table[t]["gd"], table[t]["gf"]), reverse=True)
-        ranked_table = {}
+        in_table = [t for t in range(n_teams) if table[t, 3] > 0]
+        sorted_teams = sorted(in_table, key=lambda t: (table[t, 0], table[t, 1], table[t, 2]), reverse=True)
+        ranked_table = [None] * n_teams
         for rank, t in enumerate(sorted_teams, 1):
             ranked_table[t] = {
                 "rank": rank,
-                "points": table[t]["points"],
-                "gd": table[t]["gd"],
-                "mp": table[t]["mp"]
+                "points": int(table[t, 0]),
+                "gd": int(table[t, 1]),
+                "mp": int(table[t, 3])
             }
             
         return final_form, histories, ranked_table
     except Exception as e:
         print(f"[WARNING] Blad liczenia statystyk dla {league_id}: {e}")
-        return {}, {}, {}
+        return np.empty((0, 2)), [], []
+
+def has_stats(form: np.ndarray, team_id: int | None) -> bool:
+    return team_id is not None and team_id < len(form) and not np.isnan(form[team_id, 0])
 
-def load_all_models():
-    model_files = glob.glob(str(MODELS_DIR / "model_*.pkl"))
-    if not model_files:
+def load_all_models() -> ServingState:
+    league_ids = list_artifacts(MODELS_DIR)
+    if not league_ids:
         print("[WARNING] Brak wytrenowanych modeli w folderze 'models'.")
-        return
+        return ServingState()
 
-    for f_path in model_files:
-        p = Path(f_path)
-        league_id = p.stem.replace("model_", "")
-        
+    new_models, new_stats, new_histories, new_tables, new_teams = {}, {}, {}, {}, {}
+    for league_id in league_ids:
         try:
-            models[league_id] = joblib.load(p)
+            new_models[league_id] = load_artifact(MODELS_DIR, league_id, eager=True)
             league_dir = DATA_DIR / league_id
             
             if league_dir.exists():
-                last_stats[league_id], raw_histories[league_id], league_tables[league_id] = load_latest_stats_for_league(league_id, league_dir)
+                new_stats[league_id], new_histories[league_id], new_tables[league_id] = load_latest_stats_for_league(league_id, league_dir)
+                new_teams[league_id] = {t for t in range(len(new_stats[league_id])) if has_stats(new_stats[league_id], t)}
                 print(f"[OK] Zaladowano model i tabele dla ligi: {league_id.upper()}")
         except Exception as e:
             print(f"[WARNING] Blad dla ligi {league_id}.")
 
-load_all_models()
+    return ServingState(new_models, new_stats, new_histories, new_tables, new_teams)
 
-@app.get("/health")
-def health():
-    return {"status": "ok", "models_loaded": len(models)}
+def unresolved_detail(s: ServingState, league_id: str, inp: PredictIn, home_id: int | None, away_id: int | None) -> dict:
+    # Zamiast stalych 0.33/0.34/0.33 klient dostaje blad z podpowiedziami druzyn z tej ligi
+    if league_id not in s.models:
+        return {"message": f"Nieznana liga: {inp.league_id}", "suggestions": {}}
 
-@app.post("/api/predict")
-def predict(inp: PredictIn):
-    league_id = inp.league_id.lower()
-    
-    if league_id not in models or inp.home_team not in last_stats.get(league_id, {}) or inp.away_team not in last_stats.get(league_id, {}):
-        return {
-            "label": "draw", 
-            "probs": {"home": 0.33, "draw": 0.34, "away": 0.33},
-            "home_form": [], "away_form": [],
-            "home_stats": {"avg_goals": 0.0, "avg_points": 0.0},
-            "away_stats": {"avg_goals": 0.0, "avg_points": 0.0},
-            "home_table": {"rank": 0, "points": 0, "gd": 0, "mp": 0},
-            "away_table": {"rank": 0, "points": 0, "gd": 0, "mp": 0}
-        }
-        
-    model_artifacts = models[league_id]
-    current_stats = last_stats[league_id]
-    current_histories = raw_histories[league_id]
-    current_table = league_tables[league_id]
-
-    h_form = current_stats[inp.home_team]
-    a_form = current_stats[inp.away_team]
-
-    features = np.array([[ h_form[0], a_form[0], h_form[1], a_form[1] ]])
-    features_scaled = model_artifacts["scaler"].transform(features)
-    probs_raw = model_artifacts["model"].predict_proba(features_scaled)[0]
-    
-    classes = model_artifacts["model"].classes_
-    class_labels = model_artifacts["target_encoder"].inverse_transform(classes)
-    
-    probs = {l: float(p) for l, p in zip(class_labels, probs_raw)}
+    form = s.last_stats.get(league_id, np.empty((0, 2)))
+    allowed = s.league_teams.get(league_id, set())
+    suggestions = {}
+    for field_name, name, team_id in (("home_team", inp.home_team, home_id), ("away_team", inp.away_team, away_id)):
+        if not has_stats(form, team_id):
+            suggestions[field_name] = [TEAMS.names[t] for t in TEAMS.search(name, limit=5, allowed=allowed)]
+    missing = ", ".join(getattr(inp, f) for f in suggestions)
+    return {"message": f"Nieznana druzyna w lidze {league_id}: {missing}", "suggestions": suggestions}
+
+def match_features(form: np.ndarray, home_ids, away_ids) -> np.ndarray:
+    return np.column_stack([form[home_ids, 0], form[away_ids, 0], form[home_ids, 1], form[away_ids, 1]])
+
+def build_response(s: ServingState, league_id: str, home_id: int, away_id: int, probs_raw: np.ndarray) -> dict:
+    h_form = s.last_stats[league_id][home_id]
+    a_form = s.last_stats[league_id][away_id]
+    current_histories = s.raw_histories[league_id]
+    current_table = s.league_tables[league_id]
+
+    probs = {l: float(p) for l, p in zip(s.models[league_id].classes, probs_raw)}
     best_label = max(probs.items(), key=lambda item: item[1])[0] 
 
     return {
         "label": best_label, 
         "probs": probs,
-        "home_form": current_histories.get(inp.home_team, []),
-        "away_form": current_histories.get(inp.away_team, []),
+        "home_form": current_histories[home_id],
+        "away_form": current_histories[away_id],
         "home_stats": {"avg_goals": round(float(h_form[0]), 2), "avg_points": round(float(h_form[1]), 2)},
         "away_stats": {"avg_goals": round(float(a_form[0]), 2), "avg_points": round(float(a_form[1]), 2)},
-        "home_table": current_table.get(inp.home_team, {"rank": 0, "points": 0, "gd": 0, "mp": 0}),
-        "away_table": current_table.get(inp.away_team, {"rank": 0, "points": 0, "gd": 0, "mp": 0})
-    }
\ No newline at end of file
+        "home_table": current_table[home_id] or EMPTY_TABLE,
+        "away_table": current_table[away_id] or EMPTY_TABLE
+    }
+
+def predict_many(s: ServingState, items: list[PredictIn]) -> list[dict]:
+    results: list[dict | None] = [None] * len(items)
+    pending: dict[str, list[tuple[int, int, int]]] = {}
+
+    for i, inp in enumerate(items):
+        league_id = inp.league_id.lower()
+        home_id = TEAMS.get_id(inp.home_team)
+        away_id = TEAMS.get_id(inp.away_team)
+
+        # Mecze z terminarza sa policzone z gory przez harmonogram
+        cached = s.prediction_cache.get((league_id, home_id, away_id))
+        if cached is not None:
+            results[i] = cached
+            continue
+
+        current_stats = s.last_stats.get(league_id, np.empty((0, 2)))
+        if league_id not in s.models or not has_stats(current_stats, home_id) or not has_stats(current_stats, away_id):
+            results[i] = {"detail": unresolved_detail(s, league_id, inp, home_id, away_id)}
+            continue
+        pending.setdefault(league_id, []).append((i, home_id, away_id))
+
+    # Pozostale mecze: jedno wywolanie modelu na lige
+    for league_id, rows in pending.items():
+        idx, home_ids, away_ids = zip(*rows)
+        proba = s.models[league_id].predict_proba(match_features(s.last_stats[league_id], list(home_ids), list(away_ids)))
+        for i, h, a, p in zip(idx, home_ids, away_ids, proba):
+            results[i] = build_response(s, league_id, h, a, p)
+    return results
+
+def precompute_fixtures(s: ServingState) -> ServingState:
+    upcoming = load_fixtures(fixture_files(DATA_DIR), DIVISIONS, known=set(s.models))
+    new_fixtures, new_cache = {}, {}
+
+    for league_id, group in upcoming.groupby("league_id"):
+        form = s.last_stats.get(league_id)
+        if form is None:
+            continue
+
+        rows = []
+        for date, time, home, away in group[["date", "time", "home_team", "away_team"]].itertuples(index=False, name=None):
+            h, a = TEAMS.get_id(home), TEAMS.get_id(away)
+            known = has_stats(form, h) and has_stats(form, a)
+            rows.append({"date": date.strftime("%Y-%m-%d"), "time": time, "home_team": home, "away_team": away,
+                         "home_id": h if known else None, "away_id": a if known else None})
+
+        # Jedno wywolanie modelu na lige dla wszystkich meczow z terminarza
+        ready = [r for r in rows if r["home_id"] is not None]
+        if ready:
+            home_ids = [r["home_id"] for r in ready]
+            away_ids = [r["away_id"] for r in ready]
+            proba = s.models[league_id].predict_proba(match_features(form, home_ids, away_ids))
+            for h, a, p in zip(home_ids, away_ids, proba):
+                new_cache[(league_id, h, a)] = build_response(s, league_id, h, a, p)
+        new_fixtures[league_id] = rows
+
+    print(f"[OK] Terminarz: {sum(map(len, new_fixtures.values()))} meczow, {len(new_cache)} predykcji w pamieci")
+    return replace(s, fixtures=new_fixtures, prediction_cache=new_cache)
+
+def _fingerprint(paths) -> tuple:
+    return tuple(sorted((str(p), p.stat().st_mtime_ns, p.stat().st_size) for p in paths if p.is_file()))
+
+def refresh():
+    # Po kazdym odswiezeniu danych (update_data.py / ml.train_model) przeladuj statystyki i przelicz terminarz;
+    # terminarz przeliczamy tez po zmianie daty, zeby rozegrane mecze wypadly z cache
+    global state
+    with _refresh_lock:
+        stats_fp = _fingerprint([*DATA_DIR.glob("*/*.csv"), *MODELS_DIR.glob("*.pkl"), *MODELS_DIR.glob("*/manifest.json")])
+        fixtures_fp = _fingerprint(fixture_files(DATA_DIR))
+        today = date.today().isoformat()
+        new_state = load_all_models() if stats_fp != _fingerprints["stats"] else state
+        if new_state is not state or fixtures_fp != _fingerprints["fixtures"] or today != _fingerprints["day"]:
+            state = precompute_fixtures(new_state)
+        _fingerprints["stats"], _fingerprints["fixtures"], _fingerprints["day"] = stats_fp, fixtures_fp, today
+
+def refresh_loop(stop: threading.Event):
+    while not stop.wait(REFRESH_INTERVAL):
+        try:
+            refresh()
+        except Exception as e:
+            print(f"[WARNING] Blad odswiezania danych: {e}")
+
+refresh()
+
+@app.get("/health")
+def health():
+    s = state
+    return {"status": "ok", "models_loaded": len(s.models), "predictions_cached": len(s.prediction_cache)}
+
+@app.get("/api/teams")
+def search_teams(league_id: str, q: str = "", limit: int = 10):
+    allowed = state.league_teams.get(league_id.lower())
+    if allowed is None:
+        raise HTTPException(status_code=404, detail=f"Nieznana liga: {league_id}")
+
+    if q.strip():
+        ids = TEAMS.search(q, limit=limit, allowed=allowed)
+    else:
+        ids = sorted(allowed, key=lambda t: TEAMS.names[t])[:limit]
+    return {"teams": [{"id": t, "name": TEAMS.names[t]} for t in ids]}
+
+@app.get("/api/fixtures")
+def list_fixtures(league_id: str | None = None):
+    s = state
+    if league_id and league_id.lower() not in s.models:
+        raise HTTPException(status_code=404, detail=f"Nieznana liga: {league_id}")
+    league_ids = [league_id.lower()] if league_id else sorted(s.fixtures)
+    # Odswiezanie dziala co REFRESH_INTERVAL - do tego czasu pomijamy mecze z minionych dni
+    today = date.today().isoformat()
+
+    result = []
+    for lid in league_ids:
+        for f in s.fixtures.get(lid, []):
+            if f["date"] < today:
+                continue
+            cached = s.prediction_cache.get((lid, f["home_id"], f["away_id"]))
+            result.append({
+                "league_id": lid, "date": f["date"], "time": f["time"],
+                "home_team": f["home_team"], "away_team": f["away_team"],
+                "label": cached["label"] if cached else None,
+                "probs": cached["probs"] if cached else None,
+            })
+    return {"fixtures": result}
+
+@app.post("/api/predict")
+def predict(inp: PredictIn):
+    result = predict_many(state, [inp])[0]
+    if "detail" in result:
+        raise HTTPException(status_code=404, detail=result["detail"])
+    return result
+
+@app.post("/api/predict/batch")
+def predict_batch(inp: PredictBatchIn):
+    return {"results": predict_many(state, inp.items)}
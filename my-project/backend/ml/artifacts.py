@@ -0,0 +1,333 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from pathlib import Path
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import numpy as np
+
+from ml.utils import FEATURES
+
+# Artefakt modelu: katalog models/model_{liga}/ z manifestem JSON i surowymi tablicami .npy
+# (mapowanymi w pamieci). Stare pliki models/model_{liga}.pkl (joblib) nadal sa wczytywane.
+# Kazdy zapis trafia do nowego podkatalogu wersji, a istniejacych plikow .npy nigdy nie nadpisujemy:
+# proces, ktory zmapowal poprzednia wersje, dalej widzi jej (niezmienione) bajty.
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+KEEP_VERSIONS = 2  # biezaca + poprzednia (serwer moze jeszcze leniwie wczytywac poprzednia)
+
+def artifact_dir(models_dir: Path, league_id: str) -> Path:
+    return models_dir / f"model_{league_id}"
+
+def legacy_path(models_dir: Path, league_id: str) -> Path:
+    return models_dir / f"model_{league_id}.pkl"
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _sigmoid_calibration(a: float, b: float, x: np.ndarray) -> np.ndarray:
+    with np.errstate(over="ignore"):
+        return 1.0 / (1.0 + np.exp(a * x + b))
+
+def _export_logreg(model) -> tuple[dict[str, np.ndarray], dict]:
+    ovr = getattr(model, "multi_class", "auto") == "ovr" or model.solver == "liblinear"
+    arrays = {
+        "coef": np.asarray(model.coef_, dtype=np.float64),
+        "intercept": np.asarray(model.intercept_, dtype=np.float64),
+    }
+    return arrays, {"multinomial": not ovr}
+
+def _export_forests(forests: list) -> tuple[dict[str, np.ndarray], int]:
+    left, right, feature, threshold, value, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+
+    for forest in forests:
+        fold_roots = []
+        for tree in forest.estimators_:
+            t = tree.tree_
+            n_nodes = t.node_count
+            is_leaf = t.children_left == -1
+            own = np.arange(offset, offset + n_nodes)
+            # Liscie wskazuja na siebie, wiec przejscie drzewa to stala liczba krokow max_depth
+            left.append(np.where(is_leaf, own, t.children_left + offset))
+            right.append(np.where(is_leaf, own, t.children_right + offset))
+            feature.append(np.where(is_leaf, 0, t.feature))
+            threshold.append(t.threshold)
+
+            leaf_values = t.value[:, 0, :].astype(np.float64)
+            totals = leaf_values.sum(axis=1, keepdims=True)
+            totals[totals == 0.0] = 1.0
+            value.append(leaf_values / totals)
+
+            fold_roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, t.max_depth)
+        roots.append(fold_roots)
+
+    arrays = {
+        "tree_left": np.concatenate(left).astype(np.int32),
+        "tree_right": np.concatenate(right).astype(np.int32),
+        "tree_feature": np.concatenate(feature).astype(np.int32),
+        "tree_threshold": np.concatenate(threshold).astype(np.float64),
+        "tree_value": np.concatenate(value),
+        "tree_roots": np.asarray(roots, dtype=np.int32),
+    }
+    return arrays, max_depth
+
+def _export_forest(model) -> tuple[dict[str, np.ndarray], dict]:
+    arrays, max_depth = _export_forests([model])
+    return arrays, {"max_depth": int(max_depth), "n_classes": len(model.classes_)}
+
+def _export_calibrated_forest(model) -> tuple[dict[str, np.ndarray], dict]:
+    forests, calib_a, calib_b, calib_idx = [], [], [], []
+
+    for calibrated in model.calibrated_classifiers_:
+        if calibrated.method != "sigmoid":
+            raise ValueError(f"Nieobslugiwana metoda kalibracji: {calibrated.method}")
+        forest = calibrated.estimator if hasattr(calibrated, "estimator") else calibrated.base_estimator
+        forests.append(forest)
+        calib_a.append([c.a_ for c in calibrated.calibrators])
+        calib_b.append([c.b_ for c in calibrated.calibrators])
+        calib_idx.append(np.searchsorted(model.classes_, forest.classes_))
+
+    arrays, max_depth = _export_forests(forests)
+    arrays["calib_a"] = np.asarray(calib_a, dtype=np.float64)
+    arrays["calib_b"] = np.asarray(calib_b, dtype=np.float64)
+    arrays["calib_class_idx"] = np.asarray(calib_idx, dtype=np.int32)
+    return arrays, {"max_depth": int(max_depth), "n_classes": len(model.classes_)}
+
+def save_artifact(models_dir: Path, league_id: str, model, scaler, target_encoder,
+                  features: list[str] = FEATURES, data_hash: str | None = None,
+                  metrics: dict | None = None, extra_arrays: dict[str, np.ndarray] | None = None) -> Path:
+    import sklearn
+
+    if type(model).__name__ == "LogisticRegression":
+        model_type = "logreg"
+        arrays, params = _export_logreg(model)
+    elif type(model).__name__ == "RandomForestClassifier":
+        model_type = "rf"
+        arrays, params = _export_forest(model)
+    elif type(model).__name__ == "CalibratedClassifierCV":
+        model_type = "calibrated_rf"
+        arrays, params = _export_calibrated_forest(model)
+    else:
+        raise ValueError(f"Nieobslugiwany typ modelu: {type(model).__name__}")
+
+    arrays["scaler_mean"] = np.asarray(scaler.mean_, dtype=np.float64)
+    arrays["scaler_scale"] = np.asarray(scaler.scale_, dtype=np.float64)
+    # Dodatkowe tablice nieuzywane do predykcji (np. wspolczynniki przegranej regresji do warm startu)
+    arrays.update({name: np.asarray(arr, dtype=np.float64) for name, arr in (extra_arrays or {}).items()})
+
+    header = {
+        "model_type": model_type,
+        "params": params,
+        "features": list(features),
+        "classes": [str(c) for c in target_encoder.inverse_transform(model.classes_)],
+        "sklearn_version": sklearn.__version__,
+    }
+    return _write_artifact(models_dir, league_id, header, arrays, data_hash, metrics)
+
+def republish_artifact(models_dir: Path, league_id: str, artifact: ModelArtifact, data_hash: str | None = None,
+                       metrics: dict | None = None, extra_arrays: dict[str, np.ndarray] | None = None) -> Path:
+    # Zapis istniejacego artefaktu (np. pretendenta z models/challengers) jako modelu ligi, bez obiektow sklearn
+    arrays = {name: np.asarray(arr) for name, arr in artifact.arrays.items()}
+    arrays.update({name: np.asarray(arr, dtype=np.float64) for name, arr in (extra_arrays or {}).items()})
+    header = {key: artifact.manifest[key] for key in ("model_type", "params", "features", "classes", "sklearn_version")}
+    return _write_artifact(models_dir, league_id, header, arrays, data_hash, metrics)
+
+def _write_artifact(models_dir: Path, league_id: str, header: dict, arrays: dict[str, np.ndarray],
+                    data_hash: str | None, metrics: dict | None) -> Path:
+    out_dir = artifact_dir(models_dir, league_id)
+    created_at = datetime.now(timezone.utc)
+    version = f"v{created_at:%Y%m%dT%H%M%S}-{secrets.token_hex(3)}"
+    version_dir = out_dir / version
+    version_dir.mkdir(parents=True)
+
+    array_meta = {}
+    for name, arr in arrays.items():
+        file = version_dir / f"{name}.npy"
+        np.save(file, np.ascontiguousarray(arr))
+        array_meta[name] = {
+            "file": f"{version}/{file.name}",
+            "sha256": file_sha256(file),
+            "shape": list(arr.shape),
+            "dtype": str(arr.dtype),
+        }
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "league_id": league_id,
+        **header,
+        "data_hash": data_hash,
+        "metrics": metrics or {},
+        "created_at": created_at.isoformat(timespec="seconds"),
+        "version": version,
+        "arrays": array_meta,
+    }
+
+    # Manifest zapisywany na koncu i atomowo - przerwany zapis tablic wykryja sumy kontrolne
+    tmp_path = out_dir / (MANIFEST_NAME + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=4, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, out_dir / MANIFEST_NAME)
+    prune_versions(out_dir, version)
+    return out_dir
+
+def prune_versions(out_dir: Path, current: str, keep: int = KEEP_VERSIONS):
+    # Usuwanie starych wersji; otwarte mapowania w innych procesach pozostaja wazne (unlink nie zwalnia i-wezla)
+    older = sorted((p for p in out_dir.glob("v*") if p.is_dir() and p.name != current),
+                   key=lambda p: p.stat().st_mtime_ns, reverse=True)
+    for old in older[keep - 1:]:
+        shutil.rmtree(old, ignore_errors=True)
+    # Tablice z formatu sprzed wersjonowania (bezposrednio w katalogu artefaktu)
+    for old in out_dir.glob("*.npy"):
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+class ModelArtifact:
+    def __init__(self, path: Path, verify: bool = True):
+        self.path = Path(path)
+        self.verify = verify
+        self.manifest = json.loads((self.path / MANIFEST_NAME).read_text(encoding="utf-8"))
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Nieobslugiwana wersja artefaktu w {self.path}: {self.manifest.get('format_version')}")
+
+        self.league_id = self.manifest["league_id"]
+        self.model_type = self.manifest["model_type"]
+        self.features = self.manifest["features"]
+        self.classes = self.manifest["classes"]
+        self.data_hash = self.manifest.get("data_hash")
+        self.metrics = self.manifest.get("metrics", {})
+        self._arrays: dict[str, np.ndarray] | None = None
+
+    @property
+    def arrays(self) -> dict[str, np.ndarray]:
+        # Tablice wczytywane leniwie przy pierwszej predykcji
+        if self._arrays is None:
+            arrays = {}
+            for name, meta in self.manifest["arrays"].items():
+                file = self.path / meta["file"]
+                if not file.exists():
+                    raise FileNotFoundError(f"Brak pliku {file} - artefakt zostal zastapiony nowsza wersja, wczytaj go ponownie")
+                if self.verify and file_sha256(file) != meta["sha256"]:
+                    raise ValueError(f"Niezgodna suma kontrolna pliku {file}")
+                arr = np.load(file, mmap_mode="r", allow_pickle=False)
+                if list(arr.shape) != meta["shape"] or str(arr.dtype) != meta["dtype"]:
+                    raise ValueError(f"Niezgodny ksztalt lub typ tablicy w pliku {file}")
+                arrays[name] = arr
+            self._arrays = arrays
+        return self._arrays
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        arr = self.arrays
+        return (np.asarray(X, dtype=np.float64) - arr["scaler_mean"]) / arr["scaler_scale"]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        X_scaled = self.transform(X)
+        if self.model_type == "logreg":
+            return self._predict_logreg(X_scaled)
+        return self._predict_forest(X_scaled)
+
+    def _predict_logreg(self, X: np.ndarray) -> np.ndarray:
+        arr = self.arrays
+        scores = X @ arr["coef"].T + arr["intercept"]
+        if self.manifest["params"]["multinomial"]:
+            scores = scores - scores.max(axis=1, keepdims=True)
+            proba = np.exp(scores)
+        else:
+            proba = 1.0 / (1.0 + np.exp(-scores))
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def _predict_forest(self, X: np.ndarray) -> np.ndarray:
+        arr = self.arrays
+        params = self.manifest["params"]
+        n_classes = params["n_classes"]
+        roots = arr["tree_roots"]
+        n_folds, n_trees = roots.shape
+
+        # Drzewa sklearn porownuja cechy w float32
+        X32 = X.astype(np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(roots.reshape(1, -1), (len(X), roots.size)).copy()
+        for _ in range(params["max_depth"]):
+            go_left = X32[rows, arr["tree_feature"][node]] <= arr["tree_threshold"][node]
+            node = np.where(go_left, arr["tree_left"][node], arr["tree_right"][node])
+
+        forest_proba = arr["tree_value"][node].reshape(len(X), n_folds, n_trees, -1).mean(axis=2)
+        if self.model_type == "rf":
+            return forest_proba[:, 0, :]
+
+        proba = np.zeros((len(X), n_classes))
+        for fold in range(n_folds):
+            fold_proba = np.zeros((len(X), n_classes))
+            for j, class_idx in enumerate(arr["calib_class_idx"][fold]):
+                fold_proba[:, class_idx] = _sigmoid_calibration(arr["calib_a"][fold, j], arr["calib_b"][fold, j], forest_proba[:, fold, j])
+            totals = fold_proba.sum(axis=1, keepdims=True)
+            fold_proba = np.divide(fold_proba, totals, out=np.full_like(fold_proba, 1.0 / n_classes), where=totals != 0)
+            proba += fold_proba
+        return proba / n_folds
+
+class LegacyArtifact:
+    def __init__(self, path: Path):
+        import joblib
+
+        self.path = Path(path)
+        saved = joblib.load(self.path)
+        self.model = saved["model"]
+        self.scaler = saved["scaler"]
+        self.target_encoder = saved["target_encoder"]
+
+        self.league_id = self.path.stem.replace("model_", "")
+        self.model_type = {"LogisticRegression": "logreg", "RandomForestClassifier": "rf"}.get(type(self.model).__name__, "calibrated_rf")
+        self.features = list(FEATURES)
+        self.classes = [str(c) for c in self.target_encoder.inverse_transform(self.model.classes_)]
+        self.data_hash = None
+        self.metrics = {}
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return self.scaler.transform(X)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict_proba(self.transform(X))
+
+def list_artifacts(models_dir: Path) -> list[str]:
+    leagues = {p.name.replace("model_", "") for p in models_dir.glob("model_*") if (p / MANIFEST_NAME).exists()}
+    leagues |= {p.stem.replace("model_", "") for p in models_dir.glob("model_*.pkl")}
+    return sorted(leagues)
+
+def load_artifact(models_dir: Path, league_id: str, verify: bool = True, eager: bool = False) -> ModelArtifact | LegacyArtifact:
+    path = artifact_dir(models_dir, league_id)
+    if (path / MANIFEST_NAME).exists():
+        artifact = ModelArtifact(path, verify=verify)
+        if eager:
+            # Zmapowane od razu pliki przetrwaja usuniecie wersji przez prune_versions (np. dwa treningi
+            # miedzy odswiezeniami serwera); przy leniwym wczytaniu pierwsza predykcja trafilaby w brak pliku
+            artifact.arrays
+        return artifact
+
+    pkl = legacy_path(models_dir, league_id)
+    if pkl.exists():
+        return LegacyArtifact(pkl)
+    raise FileNotFoundError(f"Brak modelu dla ligi {league_id} w {models_dir}")
+
+def logreg_coefficients(artifact: ModelArtifact | LegacyArtifact) -> tuple[np.ndarray, np.ndarray] | None:
+    # Trening zapisuje wspolczynniki regresji (lr_coef/lr_intercept) w kazdym artefakcie, takze gdy wygral las
+    if isinstance(artifact, ModelArtifact) and "lr_coef" in artifact.manifest["arrays"]:
+        return np.array(artifact.arrays["lr_coef"]), np.array(artifact.arrays["lr_intercept"])
+    if artifact.model_type != "logreg":
+        return None
+    if isinstance(artifact, LegacyArtifact):
+        return np.array(artifact.model.coef_), np.array(artifact.model.intercept_)
+    return np.array(artifact.arrays["coef"]), np.array(artifact.arrays["intercept"])
+
+def convert_legacy(models_dir: Path, league_id: str, data_hash: str | None = None) -> Path:
+    legacy = LegacyArtifact(legacy_path(models_dir, league_id))
+    return save_artifact(models_dir, league_id, legacy.model, legacy.scaler, legacy.target_encoder,
+                         features=legacy.features, data_hash=data_hash)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+from pathlib import Path
+import time
+import numpy as np
+
+from ml.artifacts import artifact_dir, convert_legacy, legacy_path, list_artifacts, load_artifact, MANIFEST_NAME
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+MODELS_DIR = BASE_DIR / "models"
+REPEATS = 5
+
+# Przykladowy wektor cech (sr. bramek i punktow gospodarza/goscia)
+SAMPLE = np.array([[1.6, 1.2, 1.8, 1.2]])
+
+def best_time(fn, repeats: int = REPEATS) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def load_legacy_and_predict(league_id: str):
+    import joblib
+    saved = joblib.load(legacy_path(MODELS_DIR, league_id))
+    saved["model"].predict_proba(saved["scaler"].transform(SAMPLE))
+
+def load_artifact_and_predict(league_id: str):
+    load_artifact(MODELS_DIR, league_id).predict_proba(SAMPLE)
+
+def main():
+    start = time.perf_counter()
+    import joblib, sklearn.ensemble, sklearn.linear_model, sklearn.calibration
+    import_time = time.perf_counter() - start
+
+    leagues = list_artifacts(MODELS_DIR)
+    if not leagues:
+        print("Blad: Brak modeli w folderze 'models'.")
+        return
+
+    print(f"Import sklearn/joblib (tylko stary format): {import_time * 1000:.1f} ms")
+    print(f"{'Liga':<14}{'Model':<15}{'.pkl [ms]':>12}{'artefakt [ms]':>16}{'max |dp|':>12}")
+
+    total_legacy = total_new = 0.0
+    for league_id in leagues:
+        has_legacy = legacy_path(MODELS_DIR, league_id).exists()
+        if has_legacy and not (artifact_dir(MODELS_DIR, league_id) / MANIFEST_NAME).exists():
+            print(f"Konwersja {legacy_path(MODELS_DIR, league_id).name} do nowego formatu...")
+            convert_legacy(MODELS_DIR, league_id)
+
+        artifact = load_artifact(MODELS_DIR, league_id)
+        t_new = best_time(lambda: load_artifact_and_predict(league_id))
+        total_new += t_new
+
+        if has_legacy:
+            t_legacy = best_time(lambda: load_legacy_and_predict(league_id))
+            total_legacy += t_legacy
+            saved = joblib.load(legacy_path(MODELS_DIR, league_id))
+            expected = saved["model"].predict_proba(saved["scaler"].transform(SAMPLE))
+            diff = float(np.abs(expected - artifact.predict_proba(SAMPLE)).max())
+            print(f"{league_id:<14}{artifact.model_type:<15}{t_legacy * 1000:>12.2f}{t_new * 1000:>16.2f}{diff:>12.2e}")
+        else:
+            print(f"{league_id:<14}{artifact.model_type:<15}{'-':>12}{t_new * 1000:>16.2f}{'-':>12}")
+
+    print(f"\nRazem ({len(leagues)} lig): .pkl {total_legacy * 1000:.1f} ms | artefakt {total_new * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+from __future__ import annotations
+from pathlib import Path
+import json
+import math
+import numpy as np
+import pandas as pd
+
+from ml.artifacts import list_artifacts, load_artifact
+from ml.streaming import build_feature_frame, season_files
+from ml.utils import dataset_hash
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DATA_DIR = BASE_DIR / "data"
+MODELS_DIR = BASE_DIR / "models"
+REPORTS_DIR = BASE_DIR / "reports"
+
+LAST_N = 5
+TEST_SIZE = 0.2
+CLASSES = ["away", "draw", "home"]
+N_BINS = 10
+ROLLING_WINDOW = 100
+ROLLING_STEP = 10
+
+def data_files(league_dir: Path) -> list[list]:
+    # Tani odcisk danych ligi (nazwa, rozmiar, mtime plikow sezonow) - do sprawdzania, czy raport jest aktualny,
+    # bez budowania ramki cech
+    return [[p.name, p.stat().st_size, p.stat().st_mtime_ns] for p in season_files(league_dir)]
+
+def collect_predictions(league_ids: list[str], models_dir: Path = MODELS_DIR, data_dir: Path = DATA_DIR,
+                        frames: dict[str, pd.DataFrame] | None = None) -> dict:
+    # Jedyna czesc zalezna od ligi: model i cechy. Wyniki sklejane w jedna tablice z indeksem ligi.
+    parts = {"league": [], "y": [], "proba": [], "date": [], "all_league": [], "all_y": []}
+    info = []
+    for i, league_id in enumerate(league_ids):
+        artifact = load_artifact(models_dir, league_id)
+        # Ramki cech zbudowane juz w treningu nie sa liczone drugi raz
+        df = (frames or {}).get(league_id)
+        if df is None:
+            df, _ = build_feature_frame(season_files(data_dir / league_id), LAST_N)
+        current_hash = dataset_hash(df)
+        df = df.iloc[LAST_N * 2:]
+
+        y = pd.Categorical(df["target"], categories=CLASSES).codes.astype(np.int64)
+        # Ten sam podzial co train_test_split(test_size=0.2, shuffle=False) w treningu
+        n_test = math.ceil(TEST_SIZE * len(df))
+        test = df.iloc[len(df) - n_test:]
+
+        order = [artifact.classes.index(c) for c in CLASSES]
+        proba = artifact.predict_proba(test[artifact.features].values)[:, order]
+
+        parts["league"].append(np.full(n_test, i))
+        parts["y"].append(y[len(df) - n_test:])
+        parts["proba"].append(proba)
+        parts["date"].append(test["date"].values)
+        parts["all_league"].append(np.full(len(df), i))
+        parts["all_y"].append(y)
+        info.append({"model_type": artifact.model_type, "data_hash": artifact.data_hash, "dataset_hash": current_hash,
+                     "data_files": data_files(data_dir / league_id), "n_matches": len(df), "n_test": n_test})
+
+    arrays = {k: np.concatenate(v) for k, v in parts.items()}
+    arrays["info"] = info
+    return arrays
+
+def compute_metrics(league: np.ndarray, y: np.ndarray, proba: np.ndarray, dates: np.ndarray,
+                    all_league: np.ndarray, all_y: np.ndarray, n_leagues: int) -> dict[str, np.ndarray]:
+    L, K, B = n_leagues, proba.shape[1], N_BINS
+    N = len(y)
+    rows = np.arange(N)
+    onehot = np.eye(K)[y]
+    pred = proba.argmax(axis=1)
+    n = np.bincount(league, minlength=L).astype(np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        balance = np.bincount(all_league * K + all_y, minlength=L * K).reshape(L, K)
+
+        cm = np.bincount((league * K + y) * K + pred, minlength=L * K * K).reshape(L, K, K)
+        tp = np.diagonal(cm, axis1=1, axis2=2).astype(np.float64)
+        precision = tp / cm.sum(axis=1)
+        recall = tp / cm.sum(axis=2)
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+        accuracy = tp.sum(axis=1) / n
+
+        eps = np.finfo(proba.dtype).eps
+        sample_ll = -np.log(np.clip(proba[rows, y], eps, 1.0))
+        log_loss = np.bincount(league, sample_ll, minlength=L) / n
+        brier = np.bincount(league, ((proba - onehot) ** 2).sum(axis=1), minlength=L) / n
+
+        # Krzywe niezawodnosci: dla kazdej (ligi, klasy, przedzialu) liczba, srednia prognoza, czestosc
+        bins = np.minimum((proba * B).astype(np.int64), B - 1)
+        idx = ((league[:, None] * K + np.arange(K)) * B + bins).ravel()
+        size = L * K * B
+        bin_count = np.bincount(idx, minlength=size).reshape(L, K, B)
+        bin_pred = np.bincount(idx, proba.ravel(), minlength=size).reshape(L, K, B) / bin_count
+        bin_freq = np.bincount(idx, onehot.ravel(), minlength=size).reshape(L, K, B) / bin_count
+
+        # Dekompozycja Murphy'ego: BS ~ reliability - resolution + uncertainty (sumowane po klasach)
+        base_rate = np.bincount((league[:, None] * K + np.arange(K)).ravel(), onehot.ravel(), minlength=L * K).reshape(L, K) / n[:, None]
+        reliability = np.nansum(bin_count * (bin_pred - bin_freq) ** 2, axis=(1, 2)) / n
+        resolution = np.nansum(bin_count * (bin_freq - base_rate[:, :, None]) ** 2, axis=(1, 2)) / n
+        uncertainty = (base_rate * (1 - base_rate)).sum(axis=1)
+
+        # ECE na etykiecie z najwyzszym prawdopodobienstwem
+        conf = proba[rows, pred]
+        conf_idx = league * B + np.minimum((conf * B).astype(np.int64), B - 1)
+        hits = np.bincount(conf_idx, (pred == y).astype(np.float64), minlength=L * B).reshape(L, B)
+        confs = np.bincount(conf_idx, conf, minlength=L * B).reshape(L, B)
+        ece = np.abs(hits - confs).sum(axis=1) / n
+
+    # Kroczacy log loss: skumulowana suma wspolna dla wszystkich lig, okno przycinane na poczatku ligi
+    starts = np.concatenate([[0], np.cumsum(n.astype(np.int64))[:-1]])
+    pos = rows - starts[league]
+    cumsum = np.concatenate([[0.0], np.cumsum(sample_ll)])
+    lo = rows + 1 - np.minimum(pos + 1, ROLLING_WINDOW)
+    rolling = (cumsum[rows + 1] - cumsum[lo]) / (rows + 1 - lo)
+    last = np.concatenate([starts[1:] - 1, [N - 1]])
+    sampled = ((pos + 1) % ROLLING_STEP == 0) | np.isin(rows, last)
+
+    return {
+        "class_balance": balance, "confusion_matrix": cm, "accuracy": accuracy, "f1_macro": f1.mean(axis=1),
+        "log_loss": log_loss, "brier": brier, "brier_reliability": reliability, "brier_resolution": resolution,
+        "brier_uncertainty": uncertainty, "ece": ece, "bin_count": bin_count, "bin_pred": bin_pred, "bin_freq": bin_freq,
+        "rolling_league": league[sampled], "rolling_date": dates[sampled], "rolling_value": rolling[sampled],
+    }
+
+def _clean(values) -> list:
+    return [None if isinstance(v, float) and math.isnan(v) else v for v in np.asarray(values, dtype=np.float64).round(4).tolist()]
+
+def league_report(m: dict[str, np.ndarray], i: int, info: dict) -> dict:
+    balance = m["class_balance"][i]
+    on_date = m["rolling_league"] == i
+    return {
+        "model_type": info["model_type"],
+        "data_hash": info["data_hash"],
+        "dataset_hash": info["dataset_hash"],
+        "data_files": info["data_files"],
+        "n_matches": info["n_matches"],
+        "n_test": info["n_test"],
+        "class_balance": {
+            "counts": dict(zip(CLASSES, balance.tolist())),
+            "percent": dict(zip(CLASSES, _clean(100 * balance / balance.sum()))),
+        },
+        "accuracy": round(float(m["accuracy"][i]), 4),
+        "f1_macro": round(float(m["f1_macro"][i]), 4),
+        "log_loss": round(float(m["log_loss"][i]), 4),
+        "brier": round(float(m["brier"][i]), 4),
+        "brier_decomposition": {
+            "reliability": round(float(m["brier_reliability"][i]), 4),
+            "resolution": round(float(m["brier_resolution"][i]), 4),
+            "uncertainty": round(float(m["brier_uncertainty"][i]), 4),
+        },
+        "ece": round(float(m["ece"][i]), 4),
+        "reliability_curves": {
+            c: {
+                "mean_pred": _clean(m["bin_pred"][i, k]),
+                "freq": _clean(m["bin_freq"][i, k]),
+                "count": m["bin_count"][i, k].tolist(),
+            }
+            for k, c in enumerate(CLASSES)
+        },
+        "confusion_matrix": {"labels": CLASSES, "matrix": m["confusion_matrix"][i].tolist()},
+        "rolling_log_loss": {
+            "window": ROLLING_WINDOW,
+            "dates": [str(d)[:10] for d in m["rolling_date"][on_date]],
+            "values": _clean(m["rolling_value"][on_date]),
+        },
+    }
+
+def evaluate_leagues(league_ids: list[str] | None = None, models_dir: Path = MODELS_DIR, data_dir: Path = DATA_DIR,
+                     frames: dict[str, pd.DataFrame] | None = None) -> dict[str, dict]:
+    league_ids = [l for l in (league_ids or list_artifacts(models_dir)) if (data_dir / l).exists()]
+    if not league_ids:
+        return {}
+
+    p = collect_predictions(league_ids, models_dir, data_dir, frames)
+    m = compute_metrics(p["league"], p["y"], p["proba"], p["date"], p["all_league"], p["all_y"], len(league_ids))
+    return {l: league_report(m, i, p["info"][i]) for i, l in enumerate(league_ids)}
+
+def write_reports(reports: dict[str, dict], reports_dir: Path = REPORTS_DIR, models_dir: Path = MODELS_DIR):
+    reports_dir.mkdir(exist_ok=True)
+    for league_id, evaluation in reports.items():
+        path = reports_dir / f"report_{league_id}.json"
+        report = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+        # Metryki obu kandydatow z ostatniego treningu; wpis z pliku zostaje, jesli manifest ma ich mniej
+        # (np. model sprzed zapisu f1_macro albo stary .pkl bez metryk)
+        metrics = load_artifact(models_dir, league_id).metrics
+        for key in ("Baseline (LogReg)", "Challenger (RandomForest)"):
+            if metrics.get(key) and set(report.get(key, {})) <= set(metrics[key]):
+                report[key] = metrics[key]
+
+        report["evaluation"] = evaluation
+        path.write_text(json.dumps(report, indent=4, ensure_ascii=False), encoding="utf-8")
+
+def load_report(league_id: str, reports_dir: Path = REPORTS_DIR) -> dict | None:
+    path = reports_dir / f"report_{league_id}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8")).get("evaluation")
+
+def current_reports(league_ids: list[str] | None = None, models_dir: Path = MODELS_DIR, data_dir: Path = DATA_DIR,
+                    reports_dir: Path = REPORTS_DIR) -> dict[str, dict]:
+    # Raport jest aktualny, gdy pasuje i do modelu, i do plikow danych na dysku (np. po update_data.py bez treningu)
+    league_ids = [l for l in (league_ids or list_artifacts(models_dir)) if (data_dir / l).exists()]
+    reports = {l: load_report(l, reports_dir) for l in league_ids}
+
+    stale = [
+        league_id for league_id, report in reports.items()
+        if report is None
+        or report.get("data_hash") != load_artifact(models_dir, league_id).data_hash
+        or report.get("data_files") != data_files(data_dir / league_id)
+    ]
+
+    if stale:
+        fresh = evaluate_leagues(stale, models_dir, data_dir)
+        write_reports(fresh, reports_dir, models_dir)
+        reports.update(fresh)
+    return {l: r for l, r in reports.items() if r is not None}
+
+def main():
+    reports = evaluate_leagues()
+    if not reports:
+        print("Blad: Brak modeli lub danych do ewaluacji.")
+        return
+
+    write_reports(reports)
+    for league_id, r in reports.items():
+        print(f"{league_id:<14} acc {r['accuracy']:.2%} | log loss {r['log_loss']:.4f} | Brier {r['brier']:.4f} | ECE {r['ece']:.4f}")
+    print(f"Zapisano raporty do: {REPORTS_DIR}")
+
+if __name__ == "__main__":
+    main()
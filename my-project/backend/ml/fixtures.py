@@ -0,0 +1,60 @@
+from __future__ import annotations
+from pathlib import Path
+import pandas as pd
+
+from ml.streaming import target_column
+from ml.teams import normalize_name
+from ml.utils import parse_dates
+
+# Terminarz nadchodzacych meczow w formacie football-data:
+#   fixtures.csv             -> Div,Date,Time,HomeTeam,AwayTeam,...  (Div = kod ligi, np. E0)
+#   new_league_fixtures.csv  -> Country,League,Date,Time,Home,Away,...  (np. Poland,Ekstraklasa)
+FIXTURE_COLUMNS = ["league_id", "date", "time", "home_team", "away_team"]
+
+def fixture_files(data_dir: Path) -> list[Path]:
+    return sorted(Path(data_dir).glob("fixtures*.csv"))
+
+def _league_ids(df: pd.DataFrame, divisions: dict[str, str], known: set[str] | None) -> pd.Series:
+    league = pd.Series(None, index=df.index, dtype=object)
+    if "div" in df.columns:
+        league = df["div"].astype(str).str.strip().map(divisions)
+    if "league" in df.columns:
+        # Ligi "new" nie maja kodu - identyfikator to znormalizowana nazwa (Ekstraklasa -> ekstraklasa)
+        by_name = df["league"].map(lambda n: normalize_name(n).replace(" ", "") if pd.notna(n) else None)
+        league = league.fillna(by_name)
+    if known is not None:
+        league = league.where(league.isin(known))
+    return league
+
+def read_fixtures(path: Path, divisions: dict[str, str], known: set[str] | None = None) -> pd.DataFrame:
+    df = pd.read_csv(path, encoding="utf-8-sig", encoding_errors="replace", on_bad_lines="skip")
+    df = df.rename(columns=target_column)
+    df = df.loc[:, ~df.columns.duplicated()]
+    missing = [c for c in ("date", "home_team", "away_team") if c not in df.columns]
+    if missing:
+        raise ValueError(f"Brak kolumn {missing} w terminarzu {path.name}")
+
+    df["league_id"] = _league_ids(df, divisions, known)
+    df["date"] = parse_dates(df["date"])
+    df["time"] = df["time"].fillna("").astype(str).str.strip() if "time" in df.columns else ""
+    df["home_team"] = df["home_team"].astype(str).str.strip()
+    df["away_team"] = df["away_team"].astype(str).str.strip()
+    return df.dropna(subset=["league_id", "date"])[FIXTURE_COLUMNS]
+
+def load_fixtures(paths: list[Path], divisions: dict[str, str], known: set[str] | None = None,
+                  today: pd.Timestamp | None = None) -> pd.DataFrame:
+    frames = []
+    for path in paths:
+        try:
+            frames.append(read_fixtures(path, divisions, known))
+        except Exception as e:
+            print(f"[WARNING] Pomijam terminarz {path.name}: {e}")
+
+    if not frames:
+        return pd.DataFrame(columns=FIXTURE_COLUMNS)
+
+    # Tylko mecze, ktore sie jeszcze nie odbyly; ten sam mecz z dwoch plikow liczymy raz
+    today = today if today is not None else pd.Timestamp.today().normalize()
+    df = pd.concat(frames, ignore_index=True)
+    df = df[df["date"] >= today].drop_duplicates(subset=["league_id", "date", "home_team", "away_team"])
+    return df.sort_values(["league_id", "date", "time"]).reset_index(drop=True)
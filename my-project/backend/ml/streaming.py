@@ -0,0 +1,212 @@
+from __future__ import annotations
+from collections import deque
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterable, Iterator
+import heapq
+import pandas as pd
+
+from ml.teams import TEAMS
+from ml.utils import MATCH_COLUMNS, RENAME_MAP, FEATURES, parse_dates
+
+# Strumieniowe wczytywanie historii: pliki sezonow czytane kawalkami, kazdy strumien
+# posortowany chronologicznie, a strumienie laczone leniwym k-way merge: plik jest otwierany
+# dopiero, gdy scalanie dojdzie do jego pierwszej daty. W pamieci sa tylko sezony, ktorych
+# zakresy dat na siebie zachodza (zwykle jeden), i ostatnie N meczow kazdej druzyny.
+# Plik, ktorego nie da sie wczytac, jest pomijany z ostrzezeniem - jak wczesniej przy wczytywaniu folderu.
+CHUNK_SIZE = 5000
+
+Match = tuple[pd.Timestamp, str, str, int, int]
+
+def target_column(name) -> str:
+    name = str(name).strip().lstrip("\ufeff")
+    return RENAME_MAP.get(name, name.lower())
+
+def season_of(date: pd.Timestamp) -> int:
+    return date.year if date.month >= 7 else date.year - 1
+
+def normalize_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk = chunk.rename(columns=target_column)
+    missing = [c for c in MATCH_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Brak kolumn {missing} w danych meczowych")
+
+    chunk = chunk.loc[:, ~chunk.columns.duplicated()][MATCH_COLUMNS].copy()
+    chunk["date"] = parse_dates(chunk["date"])
+    chunk["home_goals"] = pd.to_numeric(chunk["home_goals"], errors="coerce")
+    chunk["away_goals"] = pd.to_numeric(chunk["away_goals"], errors="coerce")
+    chunk = chunk.dropna(subset=MATCH_COLUMNS)
+    chunk["home_goals"] = chunk["home_goals"].astype(int)
+    chunk["away_goals"] = chunk["away_goals"].astype(int)
+    return chunk
+
+def _read_chunks(path: Path, columns: list[str], chunksize: int):
+    return pd.read_csv(
+        path,
+        chunksize=chunksize,
+        usecols=lambda c: target_column(c) in columns,
+        encoding="utf-8-sig",
+        encoding_errors="replace",
+        on_bad_lines="skip",
+    )
+
+def iter_file_matches(path: Path, chunksize: int = CHUNK_SIZE, ordered: bool = True) -> Iterator[Match]:
+    if not ordered:
+        # Sezony pomieszane w pliku - caly plik sortowany w pamieci (zwykle jeden sezon)
+        with _read_chunks(path, MATCH_COLUMNS, chunksize) as reader:
+            matches = [row for chunk in reader for row in normalize_chunk(chunk).itertuples(index=False, name=None)]
+        matches.sort(key=itemgetter(0))
+        yield from matches
+        return
+
+    # Pojedyncze mecze bywaja dopisane poza kolejnoscia (np. przelozone), wiec sortujemy
+    # w obrebie sezonu i oddajemy sezon dopiero, gdy w pliku zacznie sie kolejny
+    buffer: list[Match] = []
+    buffer_season = None
+    with _read_chunks(path, MATCH_COLUMNS, chunksize) as reader:
+        for chunk in reader:
+            for row in normalize_chunk(chunk).itertuples(index=False, name=None):
+                season = season_of(row[0])
+                if buffer_season is not None and season < buffer_season:
+                    raise ValueError(f"Plik {path} nie jest uporzadkowany sezonami (mecz z {row[0].date()})")
+                if buffer_season is not None and season > buffer_season:
+                    buffer.sort(key=itemgetter(0))
+                    yield from buffer
+                    buffer = []
+                buffer_season = season
+                buffer.append(row)
+
+    buffer.sort(key=itemgetter(0))
+    yield from buffer
+
+def season_files(league_dir: Path) -> list[Path]:
+    return sorted(Path(league_dir).glob("*.csv"))
+
+def scan_file(path: Path, chunksize: int = CHUNK_SIZE) -> tuple[pd.Timestamp | None, bool]:
+    # Tani przebieg tylko po kolumnie daty przed scalaniem: bledy pliku (pusty, brak kolumn) wychodza tutaj,
+    # zanim strumien odda jakikolwiek mecz. Zwraca pierwsza date (minimum obejmuje tez wiersze bez wyniku,
+    # wiec nie jest pozniejsze od pierwszego meczu z iter_file_matches) i czy sezony ida po kolei.
+    header = pd.read_csv(path, nrows=0, encoding="utf-8-sig", encoding_errors="replace").columns
+    missing = [c for c in MATCH_COLUMNS if c not in {target_column(h) for h in header}]
+    if missing:
+        raise ValueError(f"Brak kolumn {missing}")
+
+    first, last_season, ordered = None, None, True
+    with _read_chunks(path, ["date"], chunksize) as reader:
+        for chunk in reader:
+            dates = parse_dates(chunk.iloc[:, 0]).dropna()
+            if dates.empty:
+                continue
+            seasons = dates.dt.year.where(dates.dt.month >= 7, dates.dt.year - 1)
+            if (last_season is not None and seasons.iloc[0] < last_season) or not seasons.is_monotonic_increasing:
+                ordered = False
+            last_season = seasons.iloc[-1]
+            if first is None or dates.min() < first:
+                first = dates.min()
+    return first, ordered
+
+def _guarded(matches: Iterator[Match], path: Path) -> Iterator[Match]:
+    try:
+        yield from matches
+    except Exception as e:
+        print(f"[WARNING] Przerwano wczytywanie pliku {path.name}: {e}")
+
+def stream_matches(paths: Iterable[Path], chunksize: int = CHUNK_SIZE) -> Iterator[Match]:
+    starts = []
+    for order, path in enumerate(paths):
+        try:
+            date, ordered = scan_file(path, chunksize)
+        except Exception as e:
+            print(f"[WARNING] Pomijam plik {path.name}: {e}")
+            continue
+        if date is not None:
+            starts.append((date, order, path, ordered))
+    starts.sort(key=itemgetter(0, 1))
+
+    # Kopiec (data, kolejnosc pliku, numer meczu w pliku, mecz, strumien) - remisy jak w heapq.merge
+    heap = []
+    next_file = 0
+    while heap or next_file < len(starts):
+        while next_file < len(starts) and (not heap or starts[next_file][0] <= heap[0][0]):
+            _, order, path, ordered = starts[next_file]
+            next_file += 1
+            stream = _guarded(iter_file_matches(path, chunksize, ordered), path)
+            match = next(stream, None)
+            if match is not None:
+                heapq.heappush(heap, (match[0], order, 0, match, stream))
+
+        date, order, n, match, stream = heapq.heappop(heap)
+        yield match
+        following = next(stream, None)
+        if following is not None:
+            heapq.heappush(heap, (following[0], order, n + 1, following, stream))
+
+def dedupe_matches(matches: Iterable[Match]) -> Iterator[Match]:
+    # Ponownie pobrane wiersze (ten sam mecz w dwoch plikach albo pod wariantem nazwy)
+    # maja ta sama date, wiec w posortowanym strumieniu wystarczy pamietac biezacy dzien
+    current_date = None
+    seen: set[tuple[int, int]] = set()
+    for match in matches:
+        if match[0] != current_date:
+            current_date = match[0]
+            seen.clear()
+        key = (TEAMS.intern(match[1]), TEAMS.intern(match[2]))
+        if key in seen:
+            continue
+        seen.add(key)
+        yield match
+
+class FormTracker:
+    def __init__(self, last_n: int = 5, default: tuple[float, float] = (0.0, 1.3)):
+        self.last_n = last_n
+        self.default = default
+        self.history: list[deque] = []
+        self._goal_sums: list[int] = []
+        self._pts_sums: list[int] = []
+
+    def _ensure(self, team: int):
+        while len(self.history) <= team:
+            self.history.append(deque(maxlen=self.last_n))
+            self._goal_sums.append(0)
+            self._pts_sums.append(0)
+
+    def form(self, team: int) -> tuple[float, float]:
+        self._ensure(team)
+        n = len(self.history[team])
+        if not n:
+            return self.default
+        return self._goal_sums[team] / n, self._pts_sums[team] / n
+
+    def update(self, home: int, away: int, hg: int, ag: int):
+        h_pts = 3 if hg > ag else (1 if hg == ag else 0)
+        a_pts = 3 if ag > hg else (1 if ag == hg else 0)
+
+        for team, goals, pts in ((home, hg, h_pts), (away, ag, a_pts)):
+            self._ensure(team)
+            history = self.history[team]
+            if len(history) == self.last_n:
+                old_goals, old_pts = history[0]
+                self._goal_sums[team] -= old_goals
+                self._pts_sums[team] -= old_pts
+            history.append((goals, pts))
+            self._goal_sums[team] += goals
+            self._pts_sums[team] += pts
+
+def result_label(hg: int, ag: int) -> str:
+    if hg > ag: return "home"
+    if ag > hg: return "away"
+    return "draw"
+
+def stream_features(matches: Iterable[Match], tracker: FormTracker) -> Iterator[tuple]:
+    for date, home_name, away_name, hg, ag in matches:
+        home, away = TEAMS.intern(home_name), TEAMS.intern(away_name)
+        h_g, h_p = tracker.form(home)
+        a_g, a_p = tracker.form(away)
+        yield date, home_name, away_name, hg, ag, h_g, a_g, h_p, a_p, result_label(hg, ag)
+        tracker.update(home, away, hg, ag)
+
+def build_feature_frame(paths: Iterable[Path], last_n: int = 5, chunksize: int = CHUNK_SIZE) -> tuple[pd.DataFrame, FormTracker]:
+    tracker = FormTracker(last_n)
+    rows = stream_features(dedupe_matches(stream_matches(paths, chunksize)), tracker)
+    df = pd.DataFrame.from_records(rows, columns=MATCH_COLUMNS + FEATURES + ["target"])
+    return df, tracker
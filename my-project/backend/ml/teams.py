@@ -0,0 +1,272 @@
+from __future__ import annotations
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+import bisect
+import difflib
+import json
+import re
+import threading
+import unicodedata
+
+try:
+    import fcntl
+except ImportError:  # Windows - bez blokady pliku (jeden proces naraz)
+    fcntl = None
+
+TEAMS_FILE = Path(__file__).resolve().parents[1] / "data" / "teams.jsonl"
+# Wersjonowany poczatek tabeli (druzyny z danych w repozytorium); teams.jsonl jest poza gitem i przy pierwszym
+# uruchomieniu powstaje jako jego kopia, wiec te id sa takie same w kazdym checkoucie
+TEAMS_SEED = Path(__file__).with_name("teams_seed.jsonl")
+FUZZY_CACHE_SIZE = 1024
+FUZZY_MAX_LEN = 64
+
+# Warianty nazw (frontend, inne sezony, pelne nazwy klubow) -> nazwa z plikow CSV football-data
+TEAM_ALIASES = {
+    # Ekstraklasa
+    "Gornik Z.": "Gornik Zabrze",
+    "Jagiellonia Białystok": "Jagiellonia",
+    "Legia Warszawa": "Legia",
+    "Raków Częstochowa": "Rakow",
+    "Zagłębie Lubin": "Zaglebie",
+    "Bruk-Bet Termalica": "Termalica B-B.",
+    "Wisła Kraków": "Wisla",
+    "Górnik Łęczna": "Leczna",
+    "Miedź Legnica": "Legnica",
+    # Premier League / Championship
+    "Manchester United": "Man United",
+    "Manchester Utd": "Man United",
+    "Man Utd": "Man United",
+    "Manchester City": "Man City",
+    "Nottingham Forest": "Nott'm Forest",
+    "Wolverhampton": "Wolves",
+    "Wolverhampton Wanderers": "Wolves",
+    "Tottenham Hotspur": "Tottenham",
+    "Spurs": "Tottenham",
+    "Brighton & Hove Albion": "Brighton",
+    "Brighton and Hove Albion": "Brighton",
+    "West Bromwich Albion": "West Brom",
+    "Queens Park Rangers": "QPR",
+    "Sheffield Wednesday": "Sheffield Weds",
+    "Peterborough": "Peterboro",
+    # La Liga
+    "Atletico Madrid": "Ath Madrid",
+    "Athletic Bilbao": "Ath Bilbao",
+    "Real Sociedad": "Sociedad",
+    "Real Betis": "Betis",
+    "Celta Vigo": "Celta",
+    "Rayo Vallecano": "Vallecano",
+    "Espanyol": "Espanol",
+    # Bundesliga
+    "Bayern": "Bayern Munich",
+    "Bayern München": "Bayern Munich",
+    "FC Bayern": "Bayern Munich",
+    "Eintracht Frankfurt": "Ein Frankfurt",
+    "Borussia Dortmund": "Dortmund",
+    "Borussia Monchengladbach": "M'gladbach",
+    "Bayer Leverkusen": "Leverkusen",
+    "Mainz 05": "Mainz",
+    "FSV Mainz 05": "Mainz",
+    "VfB Stuttgart": "Stuttgart",
+    "VfL Wolfsburg": "Wolfsburg",
+    "Hertha BSC": "Hertha",
+    "TSG Hoffenheim": "Hoffenheim",
+    "Leipzig": "RB Leipzig",
+    "Schalke": "Schalke 04",
+    "Koln": "FC Koln",
+    "1. FC Koln": "FC Koln",
+    # Serie A
+    "Inter Milan": "Inter",
+    "Internazionale": "Inter",
+    "AC Milan": "Milan",
+    "AS Roma": "Roma",
+    "SSC Napoli": "Napoli",
+    "Hellas Verona": "Verona",
+    # Ligue 1 / Eredivisie / Primeira / Super Lig
+    "Paris Saint-Germain": "Paris SG",
+    "PSG": "Paris SG",
+    "Olympique Marseille": "Marseille",
+    "Olympique Lyonnais": "Lyon",
+    "Saint-Etienne": "St Etienne",
+    "PSV": "PSV Eindhoven",
+    "AZ": "AZ Alkmaar",
+    "Fortuna Sittard": "For Sittard",
+    "Sporting CP": "Sp Lisbon",
+    "Braga": "Sp Braga",
+    "Istanbul Basaksehir": "Buyuksehyr",
+    "Fatih Karagumruk": "Karagumruk",
+    "Goztepe": "Goztep",
+}
+
+# Litery bez rozkladu NFKD (np. polskie "ł")
+_TRANSLIT = str.maketrans({"ł": "l", "Ł": "L", "ø": "o", "Ø": "O", "ß": "ss", "ı": "i"})
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# Czeste dopiski w pelnych nazwach klubow ("Stoke City", "Leeds United", "FC Porto"), ktorych nie ma w plikach CSV
+_AFFIXES = re.compile(r"^(?:a?fc|cf|sc) | (?:a?fc|cf|city|united)$")
+
+def normalize_name(name: str) -> str:
+    s = unicodedata.normalize("NFKD", str(name).translate(_TRANSLIT))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).lower()
+    return _NON_ALNUM.sub(" ", s).strip()
+
+class TeamRegistry:
+    # Id druzyny to numer wiersza w pliku teams.jsonl (tylko dopisywanie), wiec jest staly
+    # miedzy uruchomieniami i procesami (serwer, trening) niezaleznie od kolejnosci wczytywania lig
+    def __init__(self, aliases: dict[str, str] | None = None, fuzzy_cutoff: float = 0.85, path: Path | None = None,
+                 seed: Path | None = None):
+        self.names: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._aliases = {normalize_name(k): normalize_name(v) for k, v in (aliases or {}).items()}
+        self._display = {normalize_name(v): v for v in (aliases or {}).values()}
+        self._fuzzy_cutoff = fuzzy_cutoff
+        self._fuzzy_cache: OrderedDict[str, int | None] = OrderedDict()
+        self._index: list[tuple[str, int]] | None = None
+        # Serwer odswieza dane w osobnym watku - dopisywanie, cache LRU i przebudowa indeksu pod blokada;
+        # zbudowany indeks nie jest juz modyfikowany (tylko podmieniany), wiec search czyta go bez blokady
+        self._lock = threading.RLock()
+        self.path = Path(path) if path else None
+        self._seed = Path(seed) if seed else None
+        self._offset = 0
+        if self.path and self._seed and (not self.path.exists() or self.path.stat().st_size == 0):
+            with self._file_lock():
+                pass
+        if self.path and self.path.exists():
+            self._sync()
+
+    def _sync(self):
+        # Dociagniecie wpisow dopisanych przez inne procesy od ostatniego odczytu
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self._offset += len(line)
+                entry = json.loads(line)
+                if entry["id"] != len(self.names):
+                    raise ValueError(f"Uszkodzony plik druzyn {self.path}: id {entry['id']} zamiast {len(self.names)}")
+                self._ids.setdefault(entry["key"], entry["id"])
+                self.names.append(entry["name"])
+
+    @contextmanager
+    def _file_lock(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a+b") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # Pusty plik (pierwsze uruchomienie) zaczyna sie od kopii poczatku tabeli - pod blokada,
+                # wiec rownolegle procesy nie dopisza niczego przed nia ani nie skopiuja jej dwa razy
+                f.seek(0, 2)
+                if f.tell() == 0 and self._seed and self._seed.exists():
+                    f.write(self._seed.read_bytes())
+                    f.flush()
+                yield f
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _add(self, key: str, name: str) -> int:
+        if self.path is None:
+            self._ids[key] = len(self.names)
+            self.names.append(name)
+            return self._ids[key]
+
+        with self._file_lock() as f:
+            self._sync()
+            if key not in self._ids:
+                entry = {"id": len(self.names), "key": key, "name": name}
+                line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                f.flush()
+                self._offset += len(line)
+                self._ids[key] = entry["id"]
+                self.names.append(name)
+        return self._ids[key]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _key(self, name: str) -> str:
+        key = normalize_name(name)
+        return self._aliases.get(key, key)
+
+    def intern(self, name: str) -> int:
+        key = self._key(name)
+        tid = self._ids.get(key)
+        if tid is None:
+            with self._lock:
+                tid = self._ids.get(key)
+                if tid is None:
+                    tid = self._add(key, self._display.get(key, str(name).strip()))
+                    self._fuzzy_cache.clear()
+                    self._index = None
+        return tid
+
+    def _loose_id(self, key: str) -> int | None:
+        # "Sheffield Utd" -> "sheffield united"; "Hull City" -> "hull", o ile ta krotsza nazwa jest znana
+        full = re.sub(r" utd$", " united", key)
+        for candidate in (full, _AFFIXES.sub("", full)):
+            tid = self._ids.get(self._aliases.get(candidate, candidate))
+            if tid is not None:
+                return tid
+        return None
+
+    def get_id(self, name: str, fuzzy: bool = True) -> int | None:
+        key = self._key(name)
+        tid = self._ids.get(key)
+        if tid is None:
+            tid = self._loose_id(key)
+        if tid is not None or not fuzzy or not key or len(key) > FUZZY_MAX_LEN:
+            return tid
+
+        # Klucze pochodza od klientow, wiec cache jest ograniczony (LRU)
+        with self._lock:
+            if key in self._fuzzy_cache:
+                self._fuzzy_cache.move_to_end(key)
+                return self._fuzzy_cache[key]
+            match = difflib.get_close_matches(key, self._ids.keys(), n=1, cutoff=self._fuzzy_cutoff)
+            tid = self._ids[match[0]] if match else None
+            self._fuzzy_cache[key] = tid
+            if len(self._fuzzy_cache) > FUZZY_CACHE_SIZE:
+                self._fuzzy_cache.popitem(last=False)
+            return tid
+
+    def _build_index(self) -> list[tuple[str, int]]:
+        # Kazde slowo nazwy (i aliasu) jest poczatkiem wpisu, wiec "united" znajdzie "Man United"
+        keys = list(self._ids.items())
+        keys += [(alias, self._ids[target]) for alias, target in self._aliases.items() if target in self._ids]
+
+        index = set()
+        for key, tid in keys:
+            words = key.split(" ")
+            for i in range(len(words)):
+                index.add((" ".join(words[i:]), tid))
+        return sorted(index)
+
+    def search(self, query: str, limit: int = 10, allowed: set[int] | None = None) -> list[int]:
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build_index()
+                index = self._index
+
+        q = normalize_name(query)
+        result: list[int] = []
+        if q:
+            pos = bisect.bisect_left(index, (q, -1))
+            while pos < len(index) and len(result) < limit:
+                key, tid = index[pos]
+                if not key.startswith(q):
+                    break
+                if tid not in result and (allowed is None or tid in allowed):
+                    result.append(tid)
+                pos += 1
+
+        if not result and q:
+            tid = self.get_id(q)
+            if tid is not None and (allowed is None or tid in allowed):
+                result.append(tid)
+        return result
+
+TEAMS = TeamRegistry(TEAM_ALIASES, path=TEAMS_FILE, seed=TEAMS_SEED)
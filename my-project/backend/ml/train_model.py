@@ -1,114 +1,84 @@
 from __future__ import annotations
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-import joblib
-import numpy as np
-import pandas as pd
+import argparse
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report, log_loss
-from collections import defaultdict
+from sklearn.metrics import accuracy_score, classification_report, f1_score, log_loss
 from sklearn.calibration import CalibratedClassifierCV
-import glob
 
-from ml.utils import load_matches_folder 
+from ml.utils import dataset_hash, FEATURES
+from ml.streaming import build_feature_frame, season_files
+from ml.artifacts import load_artifact, logreg_coefficients, republish_artifact, save_artifact
+from ml.evaluation import evaluate_leagues, write_reports
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 DATA_DIR = BASE_DIR / "data"
 MODELS_DIR = BASE_DIR / "models" 
+CHALLENGERS_DIR = MODELS_DIR / "challengers"  # ostatnio wytrenowany las kazdej ligi, takze gdy przegral
+REPORTS_DIR = BASE_DIR / "reports"
 MODELS_DIR.mkdir(exist_ok=True)
 
 LAST_N = 5
-
-def pts_to_char(pts: int) -> str:
-    if pts == 3: return "W"
-    if pts == 1: return "D"
-    return "L"
-
-def calculate_features(df: pd.DataFrame) -> tuple[pd.DataFrame, dict[str, list[str]]]:
-    df = df.sort_values("date").reset_index(drop=True)
-
-    team_stats = defaultdict(list)
-    h_avg_goals = []
-    a_avg_goals = []
-    h_avg_points = []
-    a_avg_points = []
-    raw_histories = {} 
-
-    for idx, row in df.iterrows():
-        home = row["home_team"]
-        away = row["away_team"]
-        hg = row["home_goals"]
-        ag = row["away_goals"]
-
-        def get_avg(team, n=LAST_N):
-            history = team_stats[team]
-            if not history:
-                return 0.0, 1.3
-            recent = history[-n:] 
-            avg_g = sum(x[0] for x in recent) / len(recent)
-            avg_p = sum(x[1] for x in recent) / len(recent)
-            return avg_g, avg_p
-
-        h_g, h_p = get_avg(home)
-        a_g, a_p = get_avg(away)
-
-        h_avg_goals.append(h_g)
-        h_avg_points.append(h_p)
-        a_avg_goals.append(a_g) 
-        a_avg_points.append(a_p)
-
-        h_pts = 3 if hg > ag else (1 if hg == ag else 0)
-        a_pts = 3 if ag > hg else (1 if ag == hg else 0)
-
-        team_stats[home].append((hg, h_pts))
-        team_stats[away].append((ag, a_pts))
-
-    for team, history in team_stats.items():
-        recent = history[-LAST_N:]
-        raw_histories[team] = [pts_to_char(x[1]) for x in recent]
-
-    df["h_form_goals"] = h_avg_goals
-    df["a_form_goals"] = a_avg_goals
-    df["h_form_points"] = h_avg_points
-    df["a_form_points"] = a_avg_points
-    results = []
-    for h, a in zip(df["home_goals"], df["away_goals"]):
-        if h > a: results.append("home")
-        elif a > h: results.append("away")
-        else: results.append("draw")
-    df["target"] = results
-    
-    return df, raw_histories
-
-def train_for_league(league_id: str, league_dir: Path):
+# Las (5 x 100 drzew z kalibracja) to wiekszosc czasu treningu - w trybie przyrostowym trenowany od nowa
+# dopiero po RF_REFIT_DAYS dniach albo gdy zbior treningowy urosnie o RF_REFIT_GROWTH
+RF_REFIT_DAYS = 7
+RF_REFIT_GROWTH = 0.1
+
+def load_previous(models_dir: Path, league_id: str):
+    try:
+        return load_artifact(models_dir, league_id)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[WARNING] Nie udalo sie wczytac poprzedniego modelu {league_id}: {e}")
+        return None
+
+def challenger_is_current(challenger, classes: list[str], n_train: int) -> bool:
+    if challenger is None or challenger.classes != classes or challenger.features != FEATURES:
+        return False
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(challenger.manifest["created_at"])
+    fitted_on = challenger.metrics.get("n_train", 0)
+    return age < timedelta(days=RF_REFIT_DAYS) and n_train < fitted_on * (1 + RF_REFIT_GROWTH)
+
+def train_for_league(league_id: str, df, incremental: bool = False) -> bool:
     print("\n=======================================================")
     print(f"Rozpoczynam trening dla Ligi: {league_id.upper()}")
     
-    raw_df = load_matches_folder(league_dir)
-    df, _ = calculate_features(raw_df)
+    data_hash = dataset_hash(df)
+
+    previous = load_previous(MODELS_DIR, league_id) if incremental else None
+    if previous is not None and previous.data_hash == data_hash:
+        print(f"Dane bez zmian (hash {data_hash[:12]}). Pomijam trening dla {league_id.upper()}.")
+        return False
     
     df = df.iloc[LAST_N * 2:] 
 
     if len(df) < 50:
         print(f"Za malo danych ({len(df)} meczow). Pomin trening dla {league_id.upper()}.")
-        return
+        return False
 
     print(f"Trenuje na {len(df)} meczach.")
 
     target_enc = LabelEncoder()
     y = target_enc.fit_transform(df["target"])
 
-    features = ["h_form_goals", "a_form_goals", "h_form_points", "a_form_points"]
-    X = df[features].values
+    X_raw = df[FEATURES].values
 
     scaler = StandardScaler()
-    X = scaler.fit_transform(X)
+    X = scaler.fit_transform(X_raw)
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
 
     model_lr = LogisticRegression(solver='lbfgs', max_iter=2000, class_weight='balanced')
+    warm = logreg_coefficients(previous) if previous is not None else None
+    if warm is not None and previous.classes == list(target_enc.classes_) and previous.features == FEATURES:
+        # Start z poprzednich wspolczynnikow - po dopisaniu kolejki lbfgs zbiega w kilku iteracjach
+        model_lr.set_params(warm_start=True)
+        model_lr.coef_, model_lr.intercept_ = warm
+        print("Regresja logistyczna: warm start z poprzedniego modelu.")
     model_lr.fit(X_train, y_train)
     
     y_pred_lr = model_lr.predict(X_test)
@@ -116,16 +86,29 @@ def train_for_league(league_id: str, league_dir: Path):
     
     acc_lr = accuracy_score(y_test, y_pred_lr)
     loss_lr = log_loss(y_test, y_proba_lr)
-
-    base_rf = RandomForestClassifier(n_estimators=100, max_depth=5, random_state=42, class_weight='balanced')
-    model_rf = CalibratedClassifierCV(estimator=base_rf, cv=5)
-    model_rf.fit(X_train, y_train)
-    
-    y_pred_rf = model_rf.predict(X_test)
-    y_proba_rf = model_rf.predict_proba(X_test)
+    f1_lr = f1_score(y_test, y_pred_lr, average="macro")
+
+    # Pretendent jest zawsze oceniany na biezacym zbiorze testowym. Podzial jest chronologiczny, a nowe mecze
+    # dochodza na koniec, wiec zapisany las nie widzial zadnego meczu testowego (ma tez wlasny scaler).
+    classes = list(target_enc.classes_)
+    challenger = load_previous(CHALLENGERS_DIR, league_id) if incremental else None
+    refit_rf = not challenger_is_current(challenger, classes, len(X_train))
+    if refit_rf:
+        base_rf = RandomForestClassifier(n_estimators=100, max_depth=5, random_state=42, class_weight='balanced')
+        model_rf = CalibratedClassifierCV(estimator=base_rf, cv=5)
+        model_rf.fit(X_train, y_train)
+        y_proba_rf = model_rf.predict_proba(X_test)
+        save_artifact(CHALLENGERS_DIR, league_id, model_rf, scaler, target_enc,
+                      features=FEATURES, data_hash=data_hash, metrics={"n_train": int(len(X_train))})
+    else:
+        model_rf = challenger
+        y_proba_rf = challenger.predict_proba(X_raw[len(X_train):])
+        print(f"Random Forest: ocena zapisanego modelu z {challenger.manifest['created_at']} (bez ponownego treningu).")
+    y_pred_rf = y_proba_rf.argmax(axis=1)
     
     acc_rf = accuracy_score(y_test, y_pred_rf)
     loss_rf = log_loss(y_test, y_proba_rf)
+    f1_rf = f1_score(y_test, y_pred_rf, average="macro")
 
     print("\n--- WYNIKI: REGRESJA LOGISTYCZNA ---")
     print(f"Accuracy: {acc_lr:.2%} | Log Loss: {loss_lr:.4f}")
@@ -161,30 +144,59 @@ def train_for_league(league_id: str, league_dir: Path):
     print(f"Accuracy: {acc_rf:.2%} | Log Loss: {loss_rf:.4f}")
     print(classification_report(y_test, y_pred_rf, target_names=target_enc.classes_))
 
-    best_model = model_lr if loss_lr < loss_rf else model_rf
     best_name = "Regresja Logistyczna" if loss_lr < loss_rf else "Random Forest"
     
     print(f"\nZwycieski model dla {league_id.upper()}: {best_name}")
 
-    to_save = {
-        "model": best_model,
-        "scaler": scaler,
-        "target_encoder": target_enc,
+    metrics = {
+        "Baseline (LogReg)": {"accuracy": round(float(acc_lr), 4), "f1_macro": round(float(f1_lr), 4), "log_loss": round(float(loss_lr), 4)},
+        "Challenger (RandomForest)": {"accuracy": round(float(acc_rf), 4), "f1_macro": round(float(f1_rf), 4), "log_loss": round(float(loss_rf), 4)},
+        "n_train": int(len(X_train)),
+        "n_test": int(len(X_test)),
+        "incremental": incremental,
+        "challenger_refit": refit_rf,
     }
-    model_path = MODELS_DIR / f"model_{league_id}.pkl"
-    joblib.dump(to_save, model_path)
+    # Wspolczynniki regresji trafiaja do kazdego artefaktu, zeby warm start dzialal tez po wygranej lasu
+    lr_arrays = {"lr_coef": model_lr.coef_, "lr_intercept": model_lr.intercept_}
+    if loss_lr < loss_rf or refit_rf:
+        model_path = save_artifact(MODELS_DIR, league_id, model_lr if loss_lr < loss_rf else model_rf, scaler, target_enc,
+                                   features=FEATURES, data_hash=data_hash, metrics=metrics, extra_arrays=lr_arrays)
+    else:
+        model_path = republish_artifact(MODELS_DIR, league_id, challenger, data_hash=data_hash,
+                                        metrics=metrics, extra_arrays=lr_arrays)
     print(f"Zapisano model do: {model_path}")
+    return True
 
-def main():
-    league_dirs = [d for d in DATA_DIR.iterdir() if d.is_dir() and d.name != '__pycache__']
+def main(incremental: bool = False):
+    league_dirs = sorted(d for d in DATA_DIR.iterdir() if d.is_dir() and d.name != '__pycache__')
     
     if not league_dirs:
         print("Blad: Nie znaleziono zadnych folderow z danymi lig w 'backend/data/'.")
         return
 
+    frames = {}
     for league_dir in league_dirs:
         league_id = league_dir.name.lower()
-        train_for_league(league_id, league_dir)
+        try:
+            df, _ = build_feature_frame(season_files(league_dir), LAST_N)
+            if train_for_league(league_id, df, incremental=incremental):
+                frames[league_id] = df
+        except Exception as e:
+            # Blad jednej ligi nie zatrzymuje treningu pozostalych
+            print(f"[WARNING] Pomijam lige {league_id.upper()}: {e}")
+    trained = list(frames)
+
+    # Raporty ewaluacji (reports/report_{liga}.json) odswiezane tylko dla lig z nowym modelem
+    if not trained:
+        print("Brak nowych modeli - raporty ewaluacji bez zmian.")
+        return
+    reports = evaluate_leagues(trained, models_dir=MODELS_DIR, data_dir=DATA_DIR, frames=frames)
+    write_reports(reports, REPORTS_DIR, MODELS_DIR)
+    print(f"Zaktualizowano raporty ewaluacji dla {len(reports)} lig.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Trening modeli dla wszystkich lig.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="pomin ligi bez zmian w danych, warm start regresji logistycznej, "
+                             f"las trenowany od nowa co {RF_REFIT_DAYS} dni")
+    main(incremental=parser.parse_args().incremental)
\ No newline at end of file
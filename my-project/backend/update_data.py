@@ -1,4 +1,5 @@
 import requests
+from datetime import date
 from pathlib import Path
 import os
 
@@ -15,12 +16,39 @@ LEAGUES_CODES = {
     "eredivisie": "N1",
     "primeira": "P1",
     "superlig": "T1",
+    "league1": "E2",
+    "league2": "E3",
+    "laliga2": "SP2",
+    "bundesliga2": "D2",
+    "serieb": "I2",
+    "ligue2": "F2",
 }
 
-SEASONS = ["2122", "2223", "2324", "2425", "2526"]
+# Terminarz nadchodzacych meczow (wszystkie ligi w jednym pliku) - wykorzystywany przez main.py
+FIXTURES_URLS = {
+    "fixtures.csv": "https://www.football-data.co.uk/fixtures.csv",
+    "fixtures_new_leagues.csv": "https://www.football-data.co.uk/new_league_fixtures.csv",
+}
+
+HISTORY_SEASONS = int(os.getenv("HISTORY_SEASONS", "20"))
+
+def season_code(start_year: int) -> str:
+    return f"{start_year % 100:02d}{(start_year + 1) % 100:02d}"
+
+def current_season_start(today: date | None = None) -> int:
+    today = today or date.today()
+    return today.year if today.month >= 7 else today.year - 1
 
-def update_league(league_id, code):
+def build_seasons(n: int = HISTORY_SEASONS) -> list[str]:
+    start = current_season_start()
+    return [season_code(year) for year in range(start - n + 1, start + 1)]
+
+SEASONS = build_seasons()
+CURRENT_SEASON = SEASONS[-1]
+
+def update_league(league_id, code, session=None):
     print(f"\n⬇️  Pobieranie historii danych dla: {league_id.upper()}...")
+    session = session or requests.Session()
     
     target_dir = DATA_DIR / league_id
     target_dir.mkdir(parents=True, exist_ok=True)
@@ -28,11 +56,15 @@ def update_league(league_id, code):
     for season in SEASONS:
         url = f"https://www.football-data.co.uk/mmz4281/{season}/{code}.csv"
         
-        filename = f"matches_current_season.csv" if season == "2526" else f"matches_{season}.csv"
+        filename = f"matches_current_season.csv" if season == CURRENT_SEASON else f"matches_{season}.csv"
         target_file = target_dir / filename
 
+        # Zakonczone sezony sie nie zmieniaja - przy dociaganiu historii pobieramy tylko brakujace
+        if season != CURRENT_SEASON and target_file.exists():
+            continue
+
         try:
-            response = requests.get(url, timeout=10)
+            response = session.get(url, timeout=10)
             
             if response.status_code == 200:
                 with open(target_file, 'wb') as f:
@@ -44,8 +76,24 @@ def update_league(league_id, code):
         except Exception as e:
             print(f"  ❌ Błąd pobierania sezonu {season}: {e}")
 
+def update_fixtures(session=None):
+    print("\n⬇️  Pobieranie terminarza nadchodzących meczów...")
+    session = session or requests.Session()
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+    for filename, url in FIXTURES_URLS.items():
+        try:
+            response = session.get(url, timeout=10)
+            if response.status_code == 200:
+                (DATA_DIR / filename).write_bytes(response.content)
+                print(f"  ✅ Terminarz: Zapisano pomyślnie ({filename})")
+            else:
+                print(f"  ❌ Terminarz {filename}: Brak danych (Błąd {response.status_code})")
+        except Exception as e:
+            print(f"  ❌ Błąd pobierania terminarza {filename}: {e}")
+
 def main():
-    print("--- AUTOMATYCZNA AKWIZYCJA DANYCH HISTORYCZNYCH (5 LAT) ---")
+    print(f"--- AUTOMATYCZNA AKWIZYCJA DANYCH HISTORYCZNYCH ({len(SEASONS)} SEZONÓW) ---")
     
     try:
         import requests
@@ -53,10 +101,12 @@ def main():
         print("❌ Brakuje biblioteki 'requests'. Zainstaluj ją komendą: pip install requests")
         return
 
-    for league_id, code in LEAGUES_CODES.items():
-        update_league(league_id, code)
+    with requests.Session() as session:
+        for league_id, code in LEAGUES_CODES.items():
+            update_league(league_id, code, session)
+        update_fixtures(session)
         
-    print("\n✅ Gotowe! Pobrane pełne 5 lat historii dla wszystkich lig.")
+    print(f"\n✅ Gotowe! Pobrane {len(SEASONS)} sezonów historii dla wszystkich lig.")
     print("Teraz uruchom trening modeli komendą:")
     print("   python -m ml.train_model")
 
@@ -3,6 +3,7 @@ import { useMemo, useState } from "react";
 import { LEAGUES } from "@/data/teams";
 import { predictFastAPI } from "@/lib/api";
 import { USE_MOCK } from "@/lib/config";
+import Select from "@/components/Select";
 import type { PredictOut, FormMatch } from "@/types/predict";
 
 function FormBar({ form }: { form?: FormMatch[] }) {
@@ -136,26 +137,26 @@ export default function Predictor() {
 
           <div className="space-y-2">
             <label className="text-xs uppercase tracking-wider text-gray-400 font-semibold">Gospodarz</label>
-            <select
-              className="w-full rounded-lg border border-gray-600 bg-gray-900 p-3 focus:ring-2 focus:ring-blue-500 outline-none transition shadow-inner"
+            <Select
               value={home}
-              onChange={(e) => setHome(e.target.value)}
+              onChange={setHome}
+              options={teams}
+              leagueId={leagueId}
+              remote={!useMock}
               disabled={loading}
-            >
-              {teams.map(t => <option key={t} value={t}>{t}</option>)}
-            </select>
+            />
           </div>
 
           <div className="space-y-2">
             <label className="text-xs uppercase tracking-wider text-gray-400 font-semibold">Gość</label>
-            <select
-              className="w-full rounded-lg border border-gray-600 bg-gray-900 p-3 focus:ring-2 focus:ring-blue-500 outline-none transition shadow-inner"
+            <Select
               value={away}
-              onChange={(e) => setAway(e.target.value)}
+              onChange={setAway}
+              options={filteredAway}
+              leagueId={leagueId}
+              remote={!useMock}
               disabled={loading}
-            >
-              {filteredAway.map(t => <option key={t} value={t}>{t}</option>)}
-            </select>
+            />
           </div>
         </div>
 
@@ -0,0 +1,53 @@
+"use client";
+import { useEffect, useId, useState } from "react";
+import { searchTeams } from "@/lib/api";
+
+type SelectProps = {
+  value: string;
+  onChange: (value: string) => void;
+  options: string[];
+  leagueId: string;
+  remote?: boolean;
+  disabled?: boolean;
+};
+
+export default function Select({ value, onChange, options, leagueId, remote = false, disabled }: SelectProps) {
+  const listId = useId();
+  const [suggestions, setSuggestions] = useState<string[]>(options);
+
+  useEffect(() => {
+    if (!remote) {
+      setSuggestions(options);
+      return;
+    }
+
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      searchTeams(leagueId, value)
+        .then(teams => { if (!cancelled) setSuggestions(teams.map(t => t.name)); })
+        .catch(() => { if (!cancelled) setSuggestions(options); });
+    }, 150);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [leagueId, value, remote, options]);
+
+  return (
+    <>
+      <input
+        className="w-full rounded-lg border border-gray-600 bg-gray-900 p-3 focus:ring-2 focus:ring-blue-500 outline-none transition shadow-inner"
+        list={listId}
+        value={value}
+        onChange={(e) => onChange(e.target.value)}
+        onFocus={(e) => e.target.select()}
+        disabled={disabled}
+        autoComplete="off"
+      />
+      <datalist id={listId}>
+        {suggestions.map(t => <option key={t} value={t} />)}
+      </datalist>
+    </>
+  );
+}
@@ -1,13 +1,30 @@
-import { PredictIn, PredictOut } from "@/types/predict";
-import { API_BASE } from "./config";
+import { PredictError, PredictIn, PredictOut, TeamOption } from "@/types/predict";
+
+async function apiError(res: Response): Promise<Error> {
+  const body: PredictError | { detail?: string } | null = await res.json().catch(() => null);
+  const detail = body?.detail;
+  if (detail && typeof detail === "object") {
+    const hints = Object.values(detail.suggestions).flat();
+    return new Error(hints.length ? `${detail.message}. Może chodziło o: ${hints.join(", ")}?` : detail.message);
+  }
+  return new Error(detail || `API ${res.status}`);
+}
 
 export async function predictFastAPI(body: PredictIn): Promise<PredictOut> {
-  const res = await fetch(`${API_BASE}/api/predict`, {
+  const res = await fetch("/api/predict", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify(body),
     cache: "no-store",
   });
-  if (!res.ok) throw new Error(`API ${res.status}`);
+  if (!res.ok) throw await apiError(res);
   return res.json();
 }
+
+export async function searchTeams(leagueId: string, q: string, limit = 10): Promise<TeamOption[]> {
+  const params = new URLSearchParams({ league_id: leagueId, q, limit: String(limit) });
+  const res = await fetch(`/api/teams?${params}`, { cache: "no-store" });
+  if (!res.ok) throw new Error(`API ${res.status}`);
+  const data: { teams: TeamOption[] } = await res.json();
+  return data.teams;
+}
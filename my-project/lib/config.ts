@@ -3,3 +3,7 @@ export const API_BASE =
 
 export const USE_MOCK =
   process.env.NEXT_PUBLIC_USE_MOCK === "1";
+
+// Adres FastAPI widziany z serwera Next.js (route /api/predict i /api/teams); domyślnie ten sam co w przeglądarce
+export const BACKEND_URL =
+  process.env.BACKEND_URL || API_BASE;
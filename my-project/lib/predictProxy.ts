@@ -0,0 +1,137 @@
+// Warstwa pośrednia między route /api/predict a FastAPI (tylko po stronie serwera):
+// - stałe połączenia keep-alive z puli agenta HTTP,
+// - identyczne zapytania (liga, gospodarz, gość) w locie dzielą jedną odpowiedź,
+// - zapytania z krótkiego okna czasowego idą jednym POST /api/predict/batch,
+// - gotowe odpowiedzi trzymane są w pamięci przez krótki TTL.
+import http from "node:http";
+import https from "node:https";
+import type { PredictError, PredictIn, PredictOut } from "@/types/predict";
+import { BACKEND_URL } from "./config";
+
+const BATCH_WINDOW_MS = Number(process.env.PREDICT_BATCH_WINDOW_MS ?? 5);
+const MAX_BATCH = 64;
+const CACHE_TTL_MS = Number(process.env.PREDICT_CACHE_TTL_MS ?? 30_000);
+const CACHE_MAX = 1000;
+const TIMEOUT_MS = 10_000;
+
+const BATCH_URL = new URL(`${BACKEND_URL.replace(/\/+$/, "")}/api/predict/batch`);
+const isHttps = BATCH_URL.protocol === "https:";
+const request: typeof http.request = isHttps ? https.request : http.request;
+const agent: http.Agent = isHttps
+  ? new https.Agent({ keepAlive: true, maxSockets: 16 })
+  : new http.Agent({ keepAlive: true, maxSockets: 16 });
+
+export type PredictResult = PredictOut | PredictError;
+
+type Pending = {
+  item: PredictIn;
+  resolve: (value: PredictResult) => void;
+  reject: (reason: unknown) => void;
+};
+
+let queue: Pending[] = [];
+let timer: ReturnType<typeof setTimeout> | null = null;
+const inflight = new Map<string, Promise<PredictResult>>();
+const cache = new Map<string, { value: PredictResult; expires: number }>();
+
+export const proxyStats = { requests: 0, cacheHits: 0, coalesced: 0, batches: 0, upstreamItems: 0 };
+
+function keyOf({ league_id, home_team, away_team }: PredictIn): string {
+  return [league_id, home_team, away_team].map(s => s.trim().toLowerCase()).join("|");
+}
+
+function postJSON<T>(url: URL, body: unknown, retry = true): Promise<T> {
+  const payload = JSON.stringify(body);
+  return new Promise<T>((resolve, reject) => {
+    const req = request(url, {
+      method: "POST",
+      agent,
+      timeout: TIMEOUT_MS,
+      headers: { "Content-Type": "application/json", "Content-Length": Buffer.byteLength(payload) },
+    }, res => {
+      const chunks: Buffer[] = [];
+      res.on("data", (chunk: Buffer) => chunks.push(chunk));
+      res.on("error", reject);
+      res.on("end", () => {
+        if (!res.statusCode || res.statusCode >= 400) {
+          reject(new Error(`API ${res.statusCode}`));
+          return;
+        }
+        try {
+          resolve(JSON.parse(Buffer.concat(chunks).toString("utf8")));
+        } catch (err) {
+          reject(err);
+        }
+      });
+    });
+    req.on("timeout", () => req.destroy(new Error("API timeout")));
+    req.on("error", (err: NodeJS.ErrnoException) => {
+      // Serwer mógł zamknąć bezczynne połączenie z puli - predykcja jest idempotentna, więc ponawiamy raz
+      if (retry && req.reusedSocket && err.code === "ECONNRESET") {
+        postJSON<T>(url, body, false).then(resolve, reject);
+      } else {
+        reject(err);
+      }
+    });
+    req.end(payload);
+  });
+}
+
+function flush() {
+  if (timer) {
+    clearTimeout(timer);
+    timer = null;
+  }
+  const batch = queue;
+  queue = [];
+  if (!batch.length) return;
+
+  proxyStats.batches += 1;
+  proxyStats.upstreamItems += batch.length;
+  postJSON<{ results: PredictResult[] }>(BATCH_URL, { items: batch.map(p => p.item) })
+    .then(({ results }) => batch.forEach((p, i) =>
+      results?.[i] ? p.resolve(results[i]) : p.reject(new Error("API: brak wyniku w odpowiedzi zbiorczej"))))
+    .catch(err => batch.forEach(p => p.reject(err)));
+}
+
+function enqueue(item: PredictIn): Promise<PredictResult> {
+  return new Promise<PredictResult>((resolve, reject) => {
+    queue.push({ item, resolve, reject });
+    if (queue.length >= MAX_BATCH) flush();
+    else if (!timer) timer = setTimeout(flush, BATCH_WINDOW_MS);
+  });
+}
+
+function remember(key: string, value: PredictResult) {
+  cache.delete(key);
+  cache.set(key, { value, expires: Date.now() + CACHE_TTL_MS });
+  // Map zachowuje kolejność wstawiania - pierwszy klucz jest najstarszy
+  if (cache.size > CACHE_MAX) cache.delete(cache.keys().next().value!);
+}
+
+export function predictProxied(item: PredictIn): Promise<PredictResult> {
+  proxyStats.requests += 1;
+  const key = keyOf(item);
+
+  const hit = cache.get(key);
+  if (hit && hit.expires > Date.now()) {
+    proxyStats.cacheHits += 1;
+    return Promise.resolve(hit.value);
+  }
+  if (hit) cache.delete(key);
+
+  let pending = inflight.get(key);
+  if (pending) {
+    proxyStats.coalesced += 1;
+    return pending;
+  }
+
+  pending = enqueue(item)
+    .then(value => {
+      remember(key, value);
+      return value;
+    })
+    .finally(() => inflight.delete(key));
+  inflight.set(key, pending);
+  return pending;
+}
@@ -30,4 +30,17 @@ export type PredictOut = {
   away_stats?: TeamStats;
   home_table?: TablePos; 
   away_table?: TablePos; 
-};
\ No newline at end of file
+};
+
+// Odpowiedź FastAPI dla nierozpoznanej ligi lub drużyny (404, w /api/predict/batch - w miejscu wyniku)
+export type PredictError = {
+  detail: {
+    message: string;
+    suggestions: Partial<Record<"home_team" | "away_team", string[]>>;
+  };
+};
+
+export type TeamOption = {
+  id: number;
+  name: string;
+};